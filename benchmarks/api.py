@@ -0,0 +1,269 @@
+"""Latency and throughput of the HTTP API, scenario by scenario.
+
+Runs every scenario in `SCENARIOS` against the ASGI `app` in-process through
+httpx's ASGITransport, or against a running server with `--url`, and prints
+p50/p95/p99 latency and req/s per request type. `--seed` first empties the
+database from `DATABASE_URL` and loads a dataset of the given size with
+`benchmarks.datagen`; it truncates every application table, so never point
+it at real data::
+
+    python -m benchmarks.api --seed --books 10000 --authors 500 --customers 2000 --reserves 20000
+    python -m benchmarks.api --url http://localhost:8000 --scenario book_get --scenario auth_me
+    python -m benchmarks.api --requests 2000 --concurrency 64 --json results.json
+
+Without `--seed` a dataset loaded earlier, by this script or by
+`benchmarks.datagen` directly, is reused.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import httpx
+from sqlalchemy import select
+
+from benchmarks import datagen
+from benchmarks.datagen import ADMIN_USERNAME, BENCH_PASSWORD
+from src.database.core import AsyncSessionLocal, engine
+from src.models import Author, Book, Customer, Gener, User
+
+
+async def load_ids() -> Dict[str, List[int]]:
+    async with AsyncSessionLocal() as session:
+        return {
+            "books": list(await session.scalars(select(Book.id))),
+            "customers": list(await session.scalars(select(Customer.user))),
+            "customer_names": list(await session.scalars(
+                select(User.username).where(User.username.like("bench-customer-%"))
+            )),
+            "geners": list(await session.scalars(select(Gener.id))),
+            "authors": list(await session.scalars(select(Author.user_id))),
+        }
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.scenario_of = {}
+        self.scenario = None
+
+    async def request(self, name: str, client: httpx.AsyncClient, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[name].append(time.perf_counter() - started)
+        self.scenario_of[name] = self.scenario
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+class Context:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, ids: dict, admin_headers: dict, rng: random.Random):
+        self.client = client
+        self.recorder = recorder
+        self.ids = ids
+        self.admin_headers = admin_headers
+        self.rng = rng
+
+    def request(self, name: str, method: str, url: str, **kwargs):
+        return self.recorder.request(name, self.client, method, url, **kwargs)
+
+
+async def login(ctx: Context) -> None:
+    username = ctx.rng.choice(ctx.ids["customer_names"])
+    await ctx.request("login", "POST", "/auth/login", json={"username": username, "password": BENCH_PASSWORD})
+
+
+async def auth_me(ctx: Context) -> None:
+    await ctx.request("auth_me", "GET", "/auth/me", headers=ctx.admin_headers)
+
+
+async def book_list(ctx: Context) -> None:
+    response = await ctx.request("book_list", "GET", "/book/", params={"limit": 50})
+    cursor = response.json().get("next_cursor") if response.status_code == 200 else None
+    if cursor:
+        await ctx.request("book_list_next", "GET", "/book/", params={"limit": 50, "cursor": cursor})
+
+
+async def book_get(ctx: Context) -> None:
+    await ctx.request("book_get", "GET", f"/book/{ctx.rng.choice(ctx.ids['books'])}")
+
+
+async def book_create(ctx: Context) -> None:
+    await ctx.request("book_create", "POST", "/book/", headers=ctx.admin_headers, json={
+        "title": "bench", "isbn": uuid.uuid4().hex[:13], "price": ctx.rng.randint(10, 500),
+        "gener": ctx.rng.choice(ctx.ids["geners"]), "unit": 10,
+        "author_ids": [ctx.rng.choice(ctx.ids["authors"])], "blurbs": ["bench"],
+    })
+
+
+async def book_update(ctx: Context) -> None:
+    book_id = ctx.rng.choice(ctx.ids["books"])
+    await ctx.request("book_update", "PUT", f"/book/{book_id}", json={"price": ctx.rng.randint(10, 500)})
+
+
+async def reserve_create(ctx: Context) -> None:
+    start = datetime.utcnow() + timedelta(days=ctx.rng.randint(0, 30))
+    await ctx.request("reserve_create", "POST", "/reserves/", headers=ctx.admin_headers, json={
+        "customer_id": ctx.rng.choice(ctx.ids["customers"]), "book_id": ctx.rng.choice(ctx.ids["books"]),
+        "start": start.isoformat(), "end": (start + timedelta(days=7)).isoformat(),
+    })
+
+
+async def reserve_batch(ctx: Context) -> None:
+    # a ten book checkout in one request, to set against ten reserve_create calls
+    start = datetime.utcnow() + timedelta(days=ctx.rng.randint(0, 30))
+    await ctx.request("reserve_batch", "POST", "/reserves/batch", headers=ctx.admin_headers, json={
+        "customer_id": ctx.rng.choice(ctx.ids["customers"]),
+        "items": [
+            {"book_id": book_id, "start": start.isoformat(), "end": (start + timedelta(days=7)).isoformat()}
+            for book_id in ctx.rng.sample(ctx.ids["books"], 10)
+        ],
+    })
+
+
+async def customer_crud(ctx: Context) -> None:
+    suffix = uuid.uuid4().hex[:12]
+    response = await ctx.request("customer_create", "POST", "/profile/customer", json={"user": {
+        "username": f"bench-tmp-{suffix}", "password": BENCH_PASSWORD, "email": f"{suffix}@bench.io",
+        "phone_number": f"0912{ctx.rng.randint(0, 9999999):07d}", "last_name": "bench",
+    }})
+    if response.status_code != 200:
+        return
+    user_id = response.json()["user_id"]
+    await ctx.request("customer_get", "GET", f"/profile/customer/{user_id}", headers=ctx.admin_headers)
+    await ctx.request("customer_update", "PATCH", f"/profile/customer/{user_id}",
+                      headers=ctx.admin_headers, json={"wallet_money": 100})
+    await ctx.request("customer_delete", "DELETE", f"/profile/customer/{user_id}", headers=ctx.admin_headers)
+
+
+SCENARIOS = {
+    "login": login,
+    "auth_me": auth_me,
+    "book_list": book_list,
+    "book_get": book_get,
+    "book_create": book_create,
+    "book_update": book_update,
+    "reserve_create": reserve_create,
+    "reserve_batch": reserve_batch,
+    "customer_crud": customer_crud,
+}
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(recorder: Recorder, elapsed: Dict[str, float]) -> list:
+    rows = []
+    for name, latencies in recorder.latencies.items():
+        latencies = sorted(latencies)
+        scenario = recorder.scenario_of[name]
+        rows.append({
+            "request": name,
+            "count": len(latencies),
+            "errors": recorder.errors[name],
+            "req_per_s": len(latencies) / elapsed[scenario] if elapsed[scenario] else 0.0,
+            "p50_ms": statistics.median(latencies) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+        })
+    return rows
+
+
+def print_table(rows: list) -> None:
+    print(f"{'request':<18}{'count':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for row in rows:
+        print(
+            f"{row['request']:<18}{row['count']:>8}{row['errors']:>8}{row['req_per_s']:>10.1f}"
+            f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+        )
+
+
+async def run_scenario(scenario, ctx: Context, requests: int, concurrency: int) -> float:
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await scenario(ctx)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started
+
+
+async def run_all(client: httpx.AsyncClient, args, rng: random.Random) -> list:
+    ids = await load_ids()
+    if not ids["books"] or not ids["customer_names"]:
+        raise SystemExit("no benchmark data found, run with --seed first")
+    response = await client.post("/auth/login", json={"username": ADMIN_USERNAME, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    admin_headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+    recorder = Recorder()
+    ctx = Context(client, recorder, ids, admin_headers, rng)
+    elapsed = {}
+    for name in args.scenario or SCENARIOS:
+        # a short warm up fills pools and caches so the first requests do not skew p99
+        await run_scenario(SCENARIOS[name], Context(client, Recorder(), ids, admin_headers, rng), args.concurrency, args.concurrency)
+        recorder.scenario = name
+        elapsed[name] = await run_scenario(SCENARIOS[name], ctx, args.requests, args.concurrency)
+    return summarize(recorder, elapsed)
+
+
+async def run(args) -> None:
+    rng = random.Random(args.random_seed)
+    try:
+        if args.seed:
+            started = time.perf_counter()
+            await datagen.generate(datagen.build_parser().parse_args([
+                "--truncate", "--books", str(args.books), "--authors", str(args.authors),
+                "--customers", str(args.customers), "--reserves", str(args.reserves),
+                "--random-seed", str(args.random_seed),
+            ]))
+            print(f"seeded in {time.perf_counter() - started:.1f}s")
+        if args.url:
+            async with httpx.AsyncClient(base_url=args.url, timeout=60) as client:
+                rows = await run_all(client, args, rng)
+        else:
+            from src.main import app
+
+            async with app.router.lifespan_context(app):
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                    rows = await run_all(client, args, rng)
+    finally:
+        await engine.dispose()
+    print_table(rows)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump({"args": vars(args), "results": rows}, file, indent=2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="repeatable, default all")
+    parser.add_argument("--requests", type=int, default=500, help="iterations per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", action="store_true", help="truncate the database and load a fresh dataset")
+    parser.add_argument("--books", type=int, default=10000)
+    parser.add_argument("--authors", type=int, default=500)
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--reserves", type=int, default=20000)
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--json", help="also write the results to this file")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
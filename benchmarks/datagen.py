@@ -0,0 +1,227 @@
+"""Deterministic bulk data for performance work.
+
+Fills the database from `DATABASE_URL` with users, authors, customers,
+geners, books, book authors, reserves and the opening wallet ledger through COPY, so millions of rows
+load in minutes. The same `--random-seed` always produces the same rows.
+Book and author popularity follow a Zipf-like curve, customers are unevenly
+active, and dates spread over the last `--years` years.
+
+Every account shares the password `BENCH_PASSWORD`, hashed once up front.
+Usernames are `bench-admin`, `bench-author-<n>` and `bench-customer-<n>`.
+The application tables must be empty, or pass `--truncate` to empty them
+first; never point it at real data::
+
+    python -m benchmarks.datagen --truncate --books 1000000 --customers 200000 --reserves 5000000
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List
+
+from sqlalchemy import text
+
+from src.auth.hashing import hash_password
+from src.database.core import engine
+from src.enums import UserRoles
+from src.models import Author, Book, BookAuthor, City, Customer, Gener, Reserve, User, WalletSnapshot, WalletTransaction
+
+
+BENCH_PASSWORD = "benchmark"
+ADMIN_USERNAME = "bench-admin"
+COPY_CHUNK = 50000
+TABLES = (WalletSnapshot, WalletTransaction, Reserve, BookAuthor, Book, Gener, Author, City, Customer, User)
+
+WORDS = (
+    "night", "river", "garden", "silent", "empire", "winter", "shadow", "letters", "journey", "city",
+    "stone", "desert", "ocean", "forgotten", "last", "golden", "house", "war", "memory", "light",
+    "secret", "island", "mountain", "storm", "song", "glass", "fire", "story", "north", "small",
+)
+CITIES = ("Tehran", "Mashhad", "Isfahan", "Karaj", "Shiraz", "Tabriz", "Qom", "Ahvaz", "Kermanshah", "Rasht")
+# subscription_model is stored by enum member name, not value
+SUBSCRIPTIONS = (("FREE", 70), ("PLUS", 20), ("PREMIUM", 10))
+
+
+def zipf_cum_weights(count: int, exponent: float, rng: random.Random) -> List[float]:
+    """Cumulative weights where a few ids are very popular, shuffled so they are not simply the lowest ids."""
+    weights = [1 / (rank + 1) ** exponent for rank in range(count)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+def chunked(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    iterator = iter(rows)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.random_seed)
+        self.now = datetime(2026, 1, 1)
+        self.span = timedelta(days=365 * args.years)
+        self.password = hash_password(BENCH_PASSWORD)
+
+        # ids are assigned here rather than by the sequences so rows can reference each other
+        self.admin_id = 1
+        self.author_ids = range(2, 2 + args.authors)
+        self.customer_ids = range(2 + args.authors, 2 + args.authors + args.customers)
+        self.book_prices = []
+        self.wallets = []
+
+    def moment(self) -> datetime:
+        return self.now - self.span * self.rng.random()
+
+    def user(self, id: int, username: str, role: str, phone: int) -> tuple:
+        created = self.moment()
+        return (
+            id, username, self.rng.choice(WORDS).title(), self.rng.choice(WORDS).title(),
+            f"{username}@example.com", f"09{phone:09d}", self.password, role, None, created, created,
+        )
+
+    def users(self) -> Iterator[tuple]:
+        yield self.user(self.admin_id, ADMIN_USERNAME, UserRoles.ADMIN, 0)
+        for n, id in enumerate(self.author_ids):
+            yield self.user(id, f"bench-author-{n}", UserRoles.AUTHOR, id)
+        for n, id in enumerate(self.customer_ids):
+            yield self.user(id, f"bench-customer-{n}", UserRoles.CUSTOMER, id)
+
+    def cities(self) -> Iterator[tuple]:
+        return ((id, name) for id, name in enumerate(CITIES, start=1))
+
+    def authors(self) -> Iterator[tuple]:
+        for id in self.author_ids:
+            yield id, self.rng.randint(1, len(CITIES)), f"{self.rng.randrange(10 ** 16):016d}"
+
+    def customers(self) -> Iterator[tuple]:
+        names, weights = zip(*SUBSCRIPTIONS)
+        for id in self.customer_ids:
+            model = self.rng.choices(names, weights)[0]
+            end = None if model == "FREE" else self.now + timedelta(days=self.rng.randint(-60, 365))
+            # enough for a few reservations, since every one is charged to the wallet
+            wallet = int(self.rng.paretovariate(1.5) * 2000) - 1000
+            self.wallets.append(wallet)
+            yield id, model, end, wallet
+
+    def wallet_transactions(self) -> Iterator[tuple]:
+        # the ledger has to sum to wallet_money, so every balance gets its opening entry
+        for id, wallet in zip(self.customer_ids, self.wallets):
+            if wallet:
+                yield id, wallet, "ADJUSTMENT", "opening balance", self.now
+
+    def geners(self) -> Iterator[tuple]:
+        return ((id, f"{self.rng.choice(WORDS)} {id}") for id in range(1, self.args.geners + 1))
+
+    def books(self) -> Iterator[tuple]:
+        gener_weights = zipf_cum_weights(self.args.geners, 1.0, self.rng)
+        geners = range(1, self.args.geners + 1)
+        for id in range(1, self.args.books + 1):
+            title = " ".join(self.rng.choices(WORDS, k=self.rng.randint(1, 4))).capitalize()
+            price = max(10, int(self.rng.lognormvariate(5, 0.6)))
+            self.book_prices.append(price)
+            created = self.moment()
+            yield (
+                id, title, f"978{id:010d}", price, self.rng.choices(geners, cum_weights=gener_weights)[0],
+                " ".join(self.rng.choices(WORDS, k=20)), self.rng.randint(0, 20), created, created,
+            )
+
+    def book_authors(self) -> Iterator[tuple]:
+        author_weights = zipf_cum_weights(self.args.authors, 1.1, self.rng)
+        for book_id in range(1, self.args.books + 1):
+            authors = set(self.rng.choices(self.author_ids, cum_weights=author_weights, k=self.rng.choice((1, 1, 1, 2, 3))))
+            for author_id in authors:
+                yield book_id, author_id, f"{self.rng.choice(WORDS)} and {self.rng.choice(WORDS)}"
+
+    def reserves(self) -> Iterator[tuple]:
+        book_weights = zipf_cum_weights(self.args.books, 1.0, self.rng)
+        customer_weights = zipf_cum_weights(self.args.customers, 0.8, self.rng)
+        books = range(1, self.args.books + 1)
+        for id in range(1, self.args.reserves + 1):
+            book_id = self.rng.choices(books, cum_weights=book_weights)[0]
+            customer_id = self.rng.choices(self.customer_ids, cum_weights=customer_weights)[0]
+            start = self.moment()
+            days = self.rng.choice((3, 7, 7, 7, 14, 14, 30))
+            end = start + timedelta(days=days)
+            returned = None
+            if end < self.now and self.rng.random() < 0.95:
+                returned = end - timedelta(hours=self.rng.randint(0, days * 24))
+            price = self.book_prices[book_id - 1] * days // 7
+            yield id, customer_id, book_id, start, end, price, returned, start, start
+
+
+TABLE_ROWS = (
+    (User, ("id", "username", "first_name", "last_name", "email", "phone_number", "password", "role", "exp", "created_at", "updated_at"), "users"),
+    (City, ("id", "name"), "cities"),
+    (Author, ("user_id", "city", "bank_number"), "authors"),
+    (Customer, ("user", "subscription_model", "subscription_end", "wallet_money"), "customers"),
+    (WalletTransaction, ("customer_id", "amount", "kind", "note", "created_at"), "wallet_transactions"),
+    (Gener, ("id", "name"), "geners"),
+    (Book, ("id", "title", "isbn", "price", "gener", "description", "unit", "created_at", "updated_at"), "books"),
+    (BookAuthor, ("book_id", "author_id", "blurb"), "book_authors"),
+    (Reserve, ("id", "customer_id", "book_id", "start", "end", "price", "returned_at", "created_at", "updated_at"), "reserves"),
+)
+
+
+async def generate(args) -> None:
+    generator = Generator(args)
+    async with engine.begin() as connection:
+        if args.truncate:
+            tables = ", ".join(f'"{model.__tablename__}"' for model in TABLES)
+            await connection.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        elif await connection.scalar(text('SELECT EXISTS (SELECT 1 FROM "user")')):
+            raise SystemExit("the database already has users, pass --truncate to replace them")
+
+        raw_connection = (await connection.get_raw_connection()).driver_connection
+        for model, columns, rows in TABLE_ROWS:
+            started, count = time.perf_counter(), 0
+            for chunk in chunked(getattr(generator, rows)(), args.chunk_size):
+                await raw_connection.copy_records_to_table(model.__tablename__, records=chunk, columns=columns)
+                count += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"{model.__tablename__:<20}{count:>12} rows {elapsed:8.1f}s {count / elapsed if elapsed else 0:>10.0f} rows/s")
+
+        # the ids above bypassed the sequences, move them past the generated rows
+        for model in (User, City, Gener, Book, Reserve):
+            table = model.__tablename__
+            await connection.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                f"coalesce((SELECT max(id) FROM \"{table}\"), 0) + 1, false)"
+            ))
+
+    async with engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("ANALYZE"))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=100000)
+    parser.add_argument("--authors", type=int, default=5000)
+    parser.add_argument("--customers", type=int, default=20000)
+    parser.add_argument("--reserves", type=int, default=200000)
+    parser.add_argument("--geners", type=int, default=40)
+    parser.add_argument("--years", type=int, default=3, help="how far back dates are spread")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=COPY_CHUNK)
+    parser.add_argument("--truncate", action="store_true", help="empty the application tables first")
+    return parser
+
+
+async def run(args) -> None:
+    started = time.perf_counter()
+    try:
+        await generate(args)
+    finally:
+        await engine.dispose()
+    print(f"done in {time.perf_counter() - started:.1f}s")
+
+
+def main() -> None:
+    asyncio.run(run(build_parser().parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""CPU spent turning a list of ORM rows into a JSON response.
+
+Mounts the same in-memory `User` list behind two routes of a throwaway app:
+one the way list endpoints used to be written (`response_model=List[UserRead]`
+and the stock JSONResponse), one through `JSONSerializer` and
+`FastJSONResponse`. Each is requested through httpx's ASGITransport and the
+process CPU time per response is reported. No database is needed::
+
+    python -m benchmarks.json_serialization --rows 100 --rows 1000 --rows 10000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from src.auth.models import User, UserRead
+from src.responses import FastJSONResponse, JSONSerializer
+
+
+def make_users(count: int) -> List[User]:
+    now = datetime.utcnow()
+    return [
+        User(
+            id=i, username=f"user-{i}", first_name="First", last_name="Last", email=f"user-{i}@example.com",
+            phone_number=f"09{i:09d}", password=b"x" * 60, role="customer", created_at=now, updated_at=now,
+        )
+        for i in range(1, count + 1)
+    ]
+
+
+def build_app(users: List[User]) -> FastAPI:
+    app = FastAPI()
+    serializer = JSONSerializer(List[UserRead])
+
+    @app.get("/stock", response_model=List[UserRead], response_class=JSONResponse)
+    async def stock():
+        return users
+
+    @app.get("/fast", response_model=List[UserRead], response_class=FastJSONResponse)
+    async def fast():
+        return serializer.response(users)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str, repeat: int) -> tuple:
+    body = (await client.get(path)).content
+    started = time.process_time()
+    for _ in range(repeat):
+        await client.get(path)
+    return (time.process_time() - started) / repeat, body
+
+
+async def run(rows: List[int], repeat: int) -> None:
+    print(f"{'rows':>8}{'stock ms':>12}{'fast ms':>12}{'speedup':>10}")
+    for count in rows:
+        app = build_app(make_users(count))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            stock, stock_body = await measure(client, "/stock", repeat)
+            fast, fast_body = await measure(client, "/fast", repeat)
+        # key order and datetime formatting may differ, the content must not
+        assert httpx.Response(200, content=stock_body).json() == httpx.Response(200, content=fast_body).json()
+        print(f"{count:>8}{stock * 1000:>12.2f}{fast * 1000:>12.2f}{stock / fast:>9.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, action="append", help="list sizes, repeatable")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows or [100, 1000, 10000], args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Event loop latency while bcrypt work is in flight.
+
+In-process mode compares verifying passwords inline on the event loop with the
+`password_hasher` pool used by `/auth/login`::
+
+    python -m benchmarks.password_hashing --concurrency 32
+
+Against a running server it fires concurrent logins for an existing user and
+probes a cheap endpoint at the same time, so the probe latency is the server's
+event loop lag::
+
+    python -m benchmarks.password_hashing --url http://localhost:8000 --username bob --password secret
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from src.auth.hashing import check_password, hash_password, password_hasher
+
+
+def summarize(name: str, lags: list, elapsed: float) -> None:
+    lags = sorted(lags)
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(
+        f"{name:>8}: loop lag p50={statistics.median(lags) * 1000:7.2f}ms "
+        f"p99={p99 * 1000:7.2f}ms max={lags[-1] * 1000:7.2f}ms  total={elapsed:.2f}s"
+    )
+
+
+async def probe_loop(stop: asyncio.Event, interval: float) -> list:
+    """Measures how late a periodic timer fires, i.e. how long the loop was blocked."""
+    lags = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+    return lags
+
+
+async def run_in_process(concurrency: int, interval: float) -> None:
+    hashed = hash_password("benchmark-password")
+
+    async def inline_verify():
+        return check_password("benchmark-password", hashed)
+
+    async def pooled_verify():
+        return await password_hasher.verify("benchmark-password", hashed)
+
+    for name, verify in (("inline", inline_verify), ("pool", pooled_verify)):
+        stop = asyncio.Event()
+        probe = asyncio.create_task(probe_loop(stop, interval))
+        await asyncio.sleep(interval * 2)
+        started = time.perf_counter()
+        await asyncio.gather(*(verify() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        summarize(name, await probe, elapsed)
+    password_hasher.shutdown()
+
+
+async def run_against_server(url: str, username: str, password: str, concurrency: int, interval: float) -> None:
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        stop = asyncio.Event()
+
+        async def probe():
+            lags = []
+            while not stop.is_set():
+                started = time.perf_counter()
+                await client.get("/openapi.json")
+                lags.append(time.perf_counter() - started)
+                await asyncio.sleep(interval)
+            return lags
+
+        probe_task = asyncio.create_task(probe())
+        await asyncio.sleep(interval * 5)
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(
+            client.post("/auth/login", json={"username": username, "password": password})
+            for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        codes = {}
+        for response in responses:
+            codes[response.status_code] = codes.get(response.status_code, 0) + 1
+        print(f"login status codes: {codes}")
+        summarize("server", await probe_task, elapsed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--interval", type=float, default=0.005, help="probe interval in seconds")
+    parser.add_argument("--url")
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    args = parser.parse_args()
+
+    if args.url:
+        asyncio.run(run_against_server(args.url, args.username, args.password, args.concurrency, args.interval))
+    else:
+        asyncio.run(run_in_process(args.concurrency, args.interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Concurrent reservations against a single book.
+
+Seeds a book with `--units` copies and a customer with enough in their wallet
+to pay for every attempt, then fires `--reservers`
+concurrent `ReserveService.create_reserve` calls, each on its own session and
+connection. Exactly `--units` of them must succeed and the stock must end at
+zero, otherwise updates were lost; tests/test_reserve_contention.py runs the
+same check on every test run, this script is for measuring throughput at
+scale. Needs the database from `DATABASE_URL` migrated to head; the seeded
+rows are removed afterwards::
+
+    python -m benchmarks.reserve_contention --units 50 --reservers 500
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.auth.hashing import hash_password
+from src.database.core import AsyncSessionLocal, engine
+from src.models import Book, Customer, Gener, Reserve, User
+from src.profile.wallet import WalletService
+from src.reserve.models import ReserveCreate
+from src.reserve.service import ReserveService
+
+
+BOOK_PRICE = 10
+
+
+async def seed(units: int, reservers: int) -> tuple:
+    suffix = uuid.uuid4().hex[:10]
+    async with AsyncSessionLocal() as session:
+        gener = Gener(name=f"contention-{suffix}")
+        user = User(username=f"contention-{suffix}", password=hash_password(suffix))
+        session.add_all([gener, user])
+        await session.flush()
+        book = Book(title="contention", isbn=suffix[:13], price=BOOK_PRICE, gener=gener.id, unit=units)
+        customer = Customer(user=user.id)
+        session.add_all([book, customer])
+        await session.flush()
+        # a week costs BOOK_PRICE, so no attempt can fail on the wallet
+        await WalletService.credit(session, user.id, BOOK_PRICE * reservers, note="contention benchmark")
+        await session.commit()
+        return gener.id, user.id, book.id
+
+
+async def cleanup(gener_id: int, user_id: int, book_id: int) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(Reserve).where(Reserve.book_id == book_id))
+        await session.execute(delete(Book).where(Book.id == book_id))
+        await session.execute(delete(Customer).where(Customer.user == user_id))
+        await session.execute(delete(User).where(User.id == user_id))
+        await session.execute(delete(Gener).where(Gener.id == gener_id))
+        await session.commit()
+
+
+async def reserve_once(customer_id: int, book_id: int) -> int:
+    start = datetime.utcnow()
+    data = ReserveCreate(customer_id=customer_id, book_id=book_id, start=start, end=start + timedelta(days=7))
+    async with AsyncSessionLocal() as session:
+        try:
+            await ReserveService.create_reserve(session, data)
+            return 200
+        except HTTPException as exc:
+            return exc.status_code
+        except PoolTimeoutError:
+            return 503
+
+
+async def run(units: int, reservers: int) -> None:
+    gener_id, user_id, book_id = await seed(units, reservers)
+    try:
+        started = time.perf_counter()
+        codes = await asyncio.gather(*(reserve_once(user_id, book_id) for _ in range(reservers)))
+        elapsed = time.perf_counter() - started
+
+        async with AsyncSessionLocal() as session:
+            remaining = await session.scalar(select(Book.unit).where(Book.id == book_id))
+            reserved = await session.scalar(select(func.count()).where(Reserve.book_id == book_id))
+
+        succeeded, out_of_stock = codes.count(200), codes.count(409)
+        other = len(codes) - succeeded - out_of_stock
+        print(f"{reservers} reservers in {elapsed:.2f}s ({reservers / elapsed:.0f} req/s)")
+        print(f"succeeded={succeeded} out_of_stock={out_of_stock} other={other}")
+        print(f"reserve rows={reserved} remaining units={remaining}")
+        if other:
+            # failures other than running out of stock say nothing about lost updates
+            failures = sorted(set(code for code in codes if code not in (200, 409)))
+            print(f"ERRORS: {other} reservations failed with {failures}")
+            raise SystemExit(1)
+        ok = succeeded == reserved == units and remaining == 0
+        print("OK" if ok else "LOST UPDATE DETECTED")
+        if not ok:
+            raise SystemExit(1)
+    finally:
+        await cleanup(gener_id, user_id, book_id)
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=50)
+    parser.add_argument("--reservers", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.units, args.reservers))
+
+
+if __name__ == "__main__":
+    main()
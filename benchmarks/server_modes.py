@@ -0,0 +1,89 @@
+"""Throughput of the development server against the production launcher.
+
+Starts `python -m src.server` once with APP_ENV=development (one reloading
+uvicorn process) and once with APP_ENV=production (gunicorn, a uvloop and
+httptools worker per core), runs the same `benchmarks.api` scenarios against
+each over real HTTP, and prints req/s and p99 side by side. Needs a dataset
+loaded with `benchmarks.datagen` in the database from `DATABASE_URL`::
+
+    python -m benchmarks.server_modes --scenario book_get --scenario book_list --concurrency 64
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+MODES = ("development", "production")
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"server exited with {process.returncode}")
+        try:
+            if httpx.get(f"{url}/metrics", timeout=1).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"server did not come up within {timeout}s")
+
+
+def run_mode(mode: str, args) -> list:
+    env = dict(os.environ, APP_ENV=mode, SERVER_PORT=str(args.port))
+    if args.workers:
+        env["WEB_CONCURRENCY"] = str(args.workers)
+    url = f"http://127.0.0.1:{args.port}"
+    # its own session, so the reloader or gunicorn master goes down with all of its children
+    server = subprocess.Popen(
+        [sys.executable, "-m", "src.server"], env=env, start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(url, server)
+        with tempfile.NamedTemporaryFile(suffix=".json") as results:
+            command = [
+                sys.executable, "-m", "benchmarks.api", "--url", url, "--json", results.name,
+                "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+            ]
+            for scenario in args.scenario or ():
+                command += ["--scenario", scenario]
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            return json.load(results)["results"]
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", help="repeatable, passed on to benchmarks.api")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--workers", type=int, help="production workers, default one per core")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    results = {mode: {row["request"]: row for row in run_mode(mode, args)} for mode in MODES}
+    print(f"{'request':<18}{'dev req/s':>12}{'prod req/s':>12}{'speedup':>9}{'dev p99':>10}{'prod p99':>10}")
+    for name, dev in results["development"].items():
+        prod = results["production"].get(name)
+        if prod is None:
+            continue
+        speedup = prod["req_per_s"] / dev["req_per_s"] if dev["req_per_s"] else 0.0
+        print(
+            f"{name:<18}{dev['req_per_s']:>12.1f}{prod['req_per_s']:>12.1f}{speedup:>8.2f}x"
+            f"{dev['p99_ms']:>10.2f}{prod['p99_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
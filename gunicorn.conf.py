@@ -0,0 +1,25 @@
+# Production server settings, read by `python -m src.server` when APP_ENV=production.
+# Send HUP to the master for a graceful restart: new workers start before old ones finish.
+import multiprocessing
+
+from src.config import settings
+
+
+bind = f"{settings.SERVER_HOST}:{settings.SERVER_PORT}"
+workers = settings.WEB_CONCURRENCY or multiprocessing.cpu_count()
+worker_class = "src.server.ProductionWorker"
+
+backlog = settings.SERVER_BACKLOG
+keepalive = settings.SERVER_KEEPALIVE
+timeout = settings.SERVER_TIMEOUT
+graceful_timeout = settings.SERVER_GRACEFUL_TIMEOUT
+# recycling workers bounds slow leaks; the jitter keeps them from restarting together
+max_requests = settings.SERVER_MAX_REQUESTS
+max_requests_jitter = settings.SERVER_MAX_REQUESTS_JITTER
+
+# the app is imported by each worker after the fork, so every worker opens its own
+# engine pool and bcrypt executor and HUP picks up new code
+preload_app = False
+
+# request counts and latency come from /metrics, ProductionWorker turns access logging off
+errorlog = "-"
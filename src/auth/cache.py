@@ -0,0 +1,53 @@
+import time
+from typing import Optional
+
+from src.cache import TTLCache
+from src.config import settings
+from src.metrics.registry import CallbackCounter, registry
+from .models import UserRead
+
+
+class TokenCache:
+    """Caches the user snapshot behind a verified JWT so authenticated requests skip the user query.
+
+    The cache lives in the worker process, so a change made through another worker only
+    becomes visible here once the entry expires; keep `AUTH_CACHE_TTL` short.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # no cached token outlives the ttl, so neither does its user's entry
+        self._tokens_by_user = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, token: str) -> Optional[UserRead]:
+        return self._cache.get(token)
+
+    def set(self, token: str, user: UserRead, exp: float) -> None:
+        # never serve a token from the cache past its own expiry
+        self._cache.set(token, user, ttl=exp - time.time())
+        tokens = {t for t in self._tokens_by_user.get(user.id, ()) if t in self._cache}
+        tokens.add(token)
+        self._tokens_by_user.set(user.id, tokens)
+
+    def invalidate_user(self, user_id: int) -> None:
+        for token in self._tokens_by_user.pop(user_id, ()):
+            self._cache.pop(token)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+token_cache = TokenCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL)
+
+registry.register(CallbackCounter(
+    "auth_token_cache_hits_total", "Authenticated requests served from the token cache",
+    lambda: {(): token_cache.stats()["hits"]},
+))
+registry.register(CallbackCounter(
+    "auth_token_cache_misses_total", "Authenticated requests that had to load the user",
+    lambda: {(): token_cache.stats()["misses"]},
+))
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import bcrypt
+from fastapi import HTTPException
+from starlette.status import HTTP_429_TOO_MANY_REQUESTS
+
+from src.config import settings
+from src.metrics.registry import CallbackGauge, registry
+
+
+password_hash_duration = registry.histogram(
+    "password_hash_duration_seconds",
+    "Time from submitting a bcrypt operation to its result, queueing included",
+    labels=("operation",),
+)
+password_hash_rejected = registry.counter(
+    "password_hash_rejected_total", "bcrypt operations rejected because the pool was saturated"
+)
+
+
+def hash_password(password: str) -> bytes:
+    """Generates a bcrypt hash of the provided password, blocking the caller."""
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+
+
+def check_password(password: str, hashed: bytes) -> bool:
+    """Checks a password against a bcrypt hash, blocking the caller."""
+    return bcrypt.checkpw(password.encode("utf-8"), hashed)
+
+
+class PasswordHasher:
+    """Runs bcrypt on a bounded worker pool so it never stalls the event loop.
+
+    At most `max_pending` operations may be running or queued at once, further
+    calls are rejected with a 429 instead of piling up behind a login storm.
+    """
+
+    def __init__(self, workers: int, max_pending: int, use_processes: bool = False):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+            self._executor = executor_class(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_pending:
+            password_hash_rejected.inc()
+            raise HTTPException(
+                status_code=HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many password checks in progress, try again later",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+            password_hash_duration.observe(time.perf_counter() - started, operation=func.__name__)
+
+    async def hash(self, password: str) -> bytes:
+        return await self.run(hash_password, password)
+
+    async def verify(self, password: str, hashed: bytes) -> bool:
+        return await self.run(check_password, password, hashed)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    use_processes=settings.PASSWORD_HASH_PROCESSES,
+)
+
+registry.register(CallbackGauge(
+    "password_hash_pending", "bcrypt operations running or queued", lambda: {(): password_hasher.pending}
+))
@@ -1,7 +1,7 @@
 from typing import Optional
 from fastapi.openapi.models import APIKey, APIKeyIn, SecuritySchemeType
 from pydantic import EmailStr, ValidationError, validator, Field
-from sqlalchemy import Column, Float, ForeignKey, Integer, String, LargeBinary, Boolean, DateTime
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer, String, LargeBinary, Boolean, DateTime
 
 
 from src.database.core import Base
@@ -15,7 +15,8 @@ from src.config import EMAIL_REGEX, IRAN_PHONE_NUMBER_REGEX, settings
 from jose import jwt
 
 from datetime import UTC, datetime, timedelta
-import bcrypt
+
+from .hashing import hash_password, password_hasher
 
 
 JWT_EXP = settings.JWT_EXP
@@ -35,26 +36,28 @@ class User(Base, TimeStampMixin, PrimaryKeyMixin):
     role = Column(String, default=UserRoles.CUSTOMER)
     exp = Column(Float, nullable=True)
 
+    # admin listings filter by role and page by id
+    __table_args__ = (
+        Index("ix_user_role_id", "role", "id"),
+    )
+
 
-    def verify_password(self, password: str) -> bool:
+    async def verify_password(self, password: str) -> bool:
         """Verify if provided password matches stored hash"""
         if not password or not self.password:
             return False
-        result = bcrypt.checkpw(password.encode("utf-8"), self.password)
-        return result
+        return await password_hasher.verify(password, self.password)
 
-    def set_password(self, password: str) -> None:
+    async def set_password(self, password: str) -> None:
         """Set a new password"""
         if not password:
             raise ValueError("Password cannot be empty")
-        self.password = self.hash_password(password)
+        self.password = await password_hasher.hash(password)
 
     @staticmethod
     def hash_password(password: str):
-        """Generates a hashed version of the provided password."""
-        pw = bytes(password, "utf-8")
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(pw, salt)
+        """Generates a hashed version of the provided password, blocking the caller."""
+        return hash_password(password)
 
 
     @property
@@ -101,7 +104,8 @@ class UserRead(UserBase):
     first_name: Optional[str] = Field(default=None, nullable=True)
     last_name: Optional[str] = Field(default=None, nullable=True)
     phone_number: Optional[str] = Field(default=None, nullable=True)
-    email: Optional[EmailStr] = Field(default=None, nullable=True)
+    # validated as EmailStr on the way in; re-checking stored addresses dominated list responses
+    email: Optional[str] = Field(default=None, nullable=True)
     role: UserRoles
     exp: Optional[float] = Field(default=None, nullable=True)
 
@@ -115,6 +119,9 @@ class UserLogin(UserBase):
         return v
 
 
+class UserFilter(BookTankBase):
+    role: Optional[UserRoles] = None
+
 class UserLoginResponse(BookTankBase):
     token: Optional[str] = Field(None, nullable=True)
 
@@ -124,9 +131,8 @@ class UserRegister(UserLogin):
 
     @validator("password", pre=True, always=True)
     def password_required(cls, v):
-        # we generate a password for those that don't have one
+        # hashing happens in `User.set_password`, off the event loop
         if not v:
             raise ValueError("Must not be empty string")
-        password = v 
-        return User.hash_password(password)
+        return v
 
@@ -57,6 +57,16 @@ class CurrentUserOrAdminPermission(BasePermission):
     def has_permission(self) -> bool:
         return any([self.user.id == self.user_id, self.user.role == UserRoles.ADMIN])
 
+class CustomerOrAdminPermission(BasePermission):
+    """Like CurrentUserOrAdminPermission, for a customer named in the body or by a stored row."""
+    def __init__(self, request: Request, user: User, customer_id: int):
+        self.user = user
+        self.request = request
+        self.customer_id = customer_id
+
+    def has_permission(self) -> bool:
+        return any([self.user.id == self.customer_id, self.user.role == UserRoles.ADMIN])
+
 class AuthorOrAdminPermission(BasePermission):
     def __init__(self, request: Request, user: User):
         self.user = user
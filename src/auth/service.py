@@ -1,8 +1,9 @@
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 
-from typing import Annotated, Optional
+from typing import Annotated, Optional, Sequence, Tuple
 from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import Row, Select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -12,7 +13,9 @@ from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_404_NOT_FOUND
 
 from src.enums import UserRoles
 from src.database.core import DbSession, get_db
-from .models import (UserCreate, User, UserUpdate)
+from .cache import token_cache
+from src.pagination import paginate_by_key
+from .models import (UserCreate, User, UserFilter, UserRead, UserUpdate)
 from src.config import settings
 
 
@@ -28,6 +31,34 @@ async def get_by_id(*, db_session: DbSession, id: int) -> Optional[User]:
     return result.scalars().one_or_none()
 
 
+# every UserRead field; reads that only return a user leave the bcrypt hash in the database
+USER_READ_COLUMNS = (
+    User.id, User.username, User.first_name, User.last_name,
+    User.phone_number, User.email, User.role, User.exp,
+)
+
+
+async def get_user_read(*, db_session: DbSession, id: int) -> Optional[Row]:
+    """Returns the public columns of a user as a row, without hydrating the entity."""
+    stmt = select(*USER_READ_COLUMNS).where(User.id == id)
+    result = await db_session.execute(stmt)
+    return result.one_or_none()
+
+
+def user_reads_query(filters: UserFilter) -> Select:
+    """Public columns of the users matching the filters."""
+    stmt = select(*USER_READ_COLUMNS)
+    if filters.role is not None:
+        stmt = stmt.where(User.role == filters.role)
+    return stmt
+
+
+async def get_user_reads_page(
+    *, db_session: DbSession, filters: UserFilter, limit: int, cursor: Optional[str] = None
+) -> Tuple[Sequence[Row], Optional[str]]:
+    return await paginate_by_key(db_session, user_reads_query(filters), User.id, limit, cursor)
+
+
 async def get_by_email(*, db_session: DbSession, email: str) -> Optional[User]:
     """Returns a user object based on user email."""
     stmt = select(User).where(User.email == email)
@@ -73,7 +104,7 @@ async def create_user(user: UserCreate, db_session: DbSession, role: UserRoles =
         )
 
     db_user = User(**user.dict(exclude={"password", "role"}), role=role)
-    db_user.set_password(user.password)
+    await db_user.set_password(user.password)
     db_session.add(db_user)
     await db_session.commit()
     await db_session.refresh(db_user)
@@ -87,11 +118,12 @@ async def update_user(*, db_session: DbSession, user: User, user_in: UserUpdate)
 
     await db_session.commit()
     await db_session.refresh(user)
+    token_cache.invalidate_user(user.id)
     return user
 
 
 
-async def get_current_user(request: Request, db_session: AsyncSession = Depends(get_db)) -> User:
+async def get_current_user(request: Request, db_session: AsyncSession = Depends(get_db)) -> UserRead:
     """Attempts to get the current user using JWT token."""
     token = request.headers.get("Authorization")
     if not token:
@@ -101,7 +133,10 @@ async def get_current_user(request: Request, db_session: AsyncSession = Depends(
         )
 
     token = token.replace("Bearer ", "")
-    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
         id = payload.get("id")
@@ -111,12 +146,14 @@ async def get_current_user(request: Request, db_session: AsyncSession = Depends(
     except JWTError:
         raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-    user = await get_by_id(db_session=db_session, id=id)
-    if user.exp != exp:
-        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Token expired")
+    user = await get_user_read(db_session=db_session, id=id)
     if not user:
         raise HTTPException(status_code=HTTP_404_NOT_FOUND, detail="User not found")
+    if user.exp != exp:
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Token expired")
 
-    return user
+    current_user = UserRead.model_validate(user, from_attributes=True)
+    token_cache.set(token, current_user, exp)
+    return current_user
 
-CurrentUser = Annotated[User, Depends(get_current_user)]
+CurrentUser = Annotated[UserRead, Depends(get_current_user)]
@@ -1,25 +1,33 @@
 import re
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, security, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, security, status
 from fastapi.security.oauth2 import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import ValidationError
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette.status import HTTP_401_UNAUTHORIZED
 
 
-from src.database.core import DbSession, get_db
+from src.config import settings
+from src.database.core import DbSession, ReadDbSession, get_db, read_sessionmaker
+from src.enums import DataFormat
+from src.pagination import Page
+from src.responses import FastJSONResponse, JSONSerializer, export_response, export_rows
 from .permissions import AdminPermission, any_permission
+from .cache import token_cache
 from .dependencies import admin_permission, current_user, current_user_or_admin
 from .service import (
     CurrentUser,
     get_by_id,
+    get_user_read,
+    get_user_reads_page,
+    user_reads_query,
     get_by_username,
     update_user as service_update_user,
     create_user as service_create_user,
 )
 from .models import (
         User,
+        UserFilter,
         UserRead,
         UserCreate,
         UserLogin,
@@ -28,9 +36,10 @@ from .models import (
 )
 
 
-auth_router = APIRouter(prefix="/auth", tags=['auth'])
-user_router = APIRouter(prefix="/user", tags=['user'])
+auth_router = APIRouter(prefix="/auth", tags=['auth'], default_response_class=FastJSONResponse)
+user_router = APIRouter(prefix="/user", tags=['user'], default_response_class=FastJSONResponse)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+user_page_serializer = JSONSerializer(Page[UserRead])
 
 
 @user_router.post("/", response_model=UserRead)
@@ -66,7 +75,7 @@ async def get_user(
     user_id: int,
     db: DbSession,
 ):
-    user = await get_by_id(db_session=db, id=user_id)
+    user = await get_user_read(db_session=db, id=user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -76,15 +85,22 @@ async def get_user(
 
 @user_router.get(
     "/", 
-    response_model=List[UserRead],
+    response_model=Page[UserRead],
     dependencies=[Depends(admin_permission)]
 )
 async def get_all_users(
-    db: DbSession,
+    request: Request,
+    db: ReadDbSession,
+    filters: UserFilter = Depends(),
+    limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    export: Optional[DataFormat] = None,
 ):
-    stmt = select(User)
-    result = await db.execute(stmt)
-    return result.scalars().all()
+    if export:
+        stmt = user_reads_query(filters).order_by(User.id)
+        return export_response(export_rows(read_sessionmaker(request), stmt, UserRead, export), export, "users")
+    users, next_cursor = await get_user_reads_page(db_session=db, filters=filters, limit=limit, cursor=cursor)
+    return user_page_serializer.response({"items": users, "next_cursor": next_cursor})
 
 @user_router.delete("/{user_id}",
                 dependencies=[Depends(admin_permission)]
@@ -101,6 +117,7 @@ async def delete_user(
         )
     await db.delete(user)
     await db.commit()
+    token_cache.invalidate_user(user_id)
     return {"message": "User deleted successfully"}
 
 
@@ -117,11 +134,12 @@ async def login_user(
     db_session: DbSession
 ):
     user = await get_by_username(db_session=db_session, username=user_in.username)
-    if user and user.verify_password(user_in.password):
+    if user and await user.verify_password(user_in.password):
         token = user.token
         db_session.add(user)
         await db_session.commit()
         await db_session.refresh(user)
+        token_cache.invalidate_user(user.id)
         return {"token": token}
 
     
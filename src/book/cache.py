@@ -0,0 +1,36 @@
+from typing import Optional
+
+from fastapi import Request, Response
+from starlette.status import HTTP_304_NOT_MODIFIED
+
+from src.cache import CachedResponse, MemoryBackend, ResponseCache, etag_matches
+from src.config import settings
+
+
+BOOK_LIST_NAMESPACE = "books"
+
+# per worker LRU; writes made through another worker reach it once BOOK_CACHE_TTL runs out
+book_cache = ResponseCache(MemoryBackend(maxsize=settings.BOOK_CACHE_SIZE), ttl=settings.BOOK_CACHE_TTL)
+
+
+def book_namespace(book_id: int) -> str:
+    return f"book:{book_id}"
+
+
+async def book_list_key(limit: int, cursor: Optional[str]) -> str:
+    version = await book_cache.version(BOOK_LIST_NAMESPACE)
+    return f"books:{version}:{limit}:{cursor or ''}"
+
+
+async def invalidate_books(*book_ids: int) -> None:
+    """Drops the cached bodies of the given books and every cached listing page."""
+    for book_id in book_ids:
+        await book_cache.invalidate(book_namespace(book_id), book_namespace(book_id))
+    await book_cache.invalidate(BOOK_LIST_NAMESPACE)
+
+
+def cached_response(request: Request, entry: CachedResponse) -> Response:
+    headers = {"ETag": entry.etag}
+    if etag_matches(request.headers.get("If-None-Match"), entry.etag):
+        return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
@@ -0,0 +1,276 @@
+"""Bulk book import.
+
+Rows are read from a CSV or NDJSON stream, validated with `BookCreateSchema` in
+batches, copied into temporary staging tables with asyncpg `COPY` and merged
+into `book`/`book_author`, upserting on ISBN. An existing book gets its catalog
+fields and author links replaced while its stock (`unit`) is left alone, since
+reservations account against it.
+
+CSV files need a header row; `author_ids` and `blurbs` hold `|` separated lists.
+Run from the command line with::
+
+    python -m src.book.importer books.csv --format csv --batch-size 5000
+"""
+import argparse
+import asyncio
+import codecs
+import csv
+import json
+import sys
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+
+from src.config import settings
+from src.database.core import AsyncSessionLocal, DbSession
+from src.enums import DataFormat
+from src.profile.models import Author
+from .cache import invalidate_books
+from .models import BookCreateSchema, BookImportError, BookImportReport, Gener
+
+
+CSV_LIST_SEPARATOR = "|"
+BOOK_COLUMNS = ("title", "isbn", "price", "gener", "description", "unit")
+BOOK_AUTHOR_COLUMNS = ("isbn", "author_id", "blurb")
+
+Record = Tuple[int, Optional[dict], Optional[str]]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Splits a stream of UTF-8 byte chunks into lines without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def parse_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    row = 0
+    async for line in lines:
+        row += 1
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield row, None, "Invalid JSON"
+            continue
+        if not isinstance(data, dict):
+            yield row, None, "Expected a JSON object"
+            continue
+        yield row, data, None
+
+
+async def parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    header = None
+    pending: List[str] = []
+    row = 0
+    async for line in lines:
+        # a quoted field may span several lines, wait until the quotes balance
+        pending.append(line)
+        text_row = "\n".join(pending)
+        if text_row.count('"') % 2:
+            continue
+        pending = []
+        if not text_row.strip():
+            continue
+
+        values = next(csv.reader([text_row]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row += 1
+        data = dict(zip(header, values))
+        for field in ("author_ids", "blurbs"):
+            value = data.get(field)
+            data[field] = [item.strip() for item in value.split(CSV_LIST_SEPARATOR)] if value else []
+        if not data.get("description"):
+            data["description"] = None
+        yield row, data, None
+
+    if pending:
+        yield row + 1, None, "Unterminated quoted field"
+
+
+def parse_records(lines: AsyncIterator[str], format: DataFormat) -> AsyncIterator[Record]:
+    return parse_csv(lines) if format == DataFormat.CSV else parse_ndjson(lines)
+
+
+class BookImportService:
+
+    @staticmethod
+    async def import_books(
+        db: DbSession, records: AsyncIterator[Record], batch_size: int = settings.BOOK_IMPORT_BATCH_SIZE
+    ) -> BookImportReport:
+        report = BookImportReport()
+        started = time.perf_counter()
+
+        batch: List[Tuple[int, BookCreateSchema]] = []
+        async for row, data, error in records:
+            report.total += 1
+            if error:
+                report.errors.append(BookImportError(row=row, errors=[error]))
+                continue
+            try:
+                book = BookCreateSchema.model_validate(data)
+            except ValidationError as exc:
+                report.errors.append(BookImportError(
+                    row=row,
+                    isbn=data.get("isbn") if isinstance(data.get("isbn"), str) else None,
+                    errors=[f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors()],
+                ))
+                continue
+            if len(book.author_ids) != len(book.blurbs):
+                report.errors.append(BookImportError(row=row, isbn=book.isbn, errors=["Each author must have a corresponding blurb"]))
+                continue
+            if len(set(book.author_ids)) != len(book.author_ids):
+                report.errors.append(BookImportError(row=row, isbn=book.isbn, errors=["author_ids: Duplicate author id"]))
+                continue
+
+            batch.append((row, book))
+            if len(batch) >= batch_size:
+                await BookImportService._load_batch(db, batch, report)
+                batch = []
+
+        if batch:
+            await BookImportService._load_batch(db, batch, report)
+
+        report.errors.sort(key=lambda error: error.row)
+        report.failed = len(report.errors)
+        report.elapsed_seconds = round(time.perf_counter() - started, 3)
+        if report.elapsed_seconds:
+            report.rows_per_second = round(report.total / report.elapsed_seconds, 1)
+        return report
+
+    @staticmethod
+    async def _load_batch(db: DbSession, batch: List[Tuple[int, BookCreateSchema]], report: BookImportReport) -> None:
+        # One query each for the referenced geners and authors, so bad references become
+        # row errors instead of failing the whole batch on a foreign key
+        gener_ids = {book.gener for _, book in batch}
+        author_ids = {author_id for _, book in batch for author_id in book.author_ids}
+        known_geners = set((await db.execute(select(Gener.id).where(Gener.id.in_(gener_ids)))).scalars())
+        known_authors = set()
+        if author_ids:
+            known_authors = set((await db.execute(select(Author.user_id).where(Author.user_id.in_(author_ids)))).scalars())
+
+        books: Dict[str, BookCreateSchema] = {}
+        rows: Dict[str, int] = {}
+        for row, book in batch:
+            errors = []
+            if book.gener not in known_geners:
+                errors.append(f"gener: Gener {book.gener} not found")
+            errors.extend(f"author_ids: Author {author_id} not found" for author_id in book.author_ids if author_id not in known_authors)
+            if book.isbn in books:
+                errors.append("isbn: Duplicate ISBN earlier in the same batch")
+            if errors:
+                report.errors.append(BookImportError(row=row, isbn=book.isbn, errors=errors))
+                continue
+            books[book.isbn] = book
+            rows[book.isbn] = row
+
+        if not books:
+            return
+
+        try:
+            await db.execute(text(
+                "CREATE TEMP TABLE book_import_staging "
+                "(title varchar(255), isbn varchar(13), price integer, gener integer, description varchar(2056), unit integer) "
+                "ON COMMIT DROP"
+            ))
+            await db.execute(text(
+                "CREATE TEMP TABLE book_author_import_staging "
+                "(isbn varchar(13), author_id integer, blurb varchar) "
+                "ON COMMIT DROP"
+            ))
+
+            # COPY runs on the raw asyncpg connection, inside the transaction begun above
+            connection = await db.connection()
+            raw_connection = (await connection.get_raw_connection()).driver_connection
+            await raw_connection.copy_records_to_table(
+                "book_import_staging",
+                records=[tuple(getattr(book, column) for column in BOOK_COLUMNS) for book in books.values()],
+                columns=BOOK_COLUMNS,
+            )
+            await raw_connection.copy_records_to_table(
+                "book_author_import_staging",
+                records=[
+                    (book.isbn, author_id, blurb)
+                    for book in books.values()
+                    for author_id, blurb in zip(book.author_ids, book.blurbs)
+                ],
+                columns=BOOK_AUTHOR_COLUMNS,
+            )
+
+            result = await db.execute(text(
+                "INSERT INTO book (title, isbn, price, gener, description, unit, created_at, updated_at) "
+                "SELECT title, isbn, price, gener, description, unit, timezone('utc', now()), timezone('utc', now()) "
+                "FROM book_import_staging "
+                "ON CONFLICT (isbn) DO UPDATE SET "
+                "title = EXCLUDED.title, price = EXCLUDED.price, gener = EXCLUDED.gener, "
+                "description = EXCLUDED.description, updated_at = EXCLUDED.updated_at "
+                "RETURNING id, (xmax = 0) AS created"
+            ))
+            merged = result.all()
+            created = sum(1 for row in merged if row.created)
+
+            await db.execute(text(
+                "DELETE FROM book_author USING book JOIN book_import_staging staging ON staging.isbn = book.isbn "
+                "WHERE book_author.book_id = book.id"
+            ))
+            await db.execute(text(
+                "INSERT INTO book_author (book_id, author_id, blurb) "
+                "SELECT book.id, staging.author_id, staging.blurb "
+                "FROM book_author_import_staging staging JOIN book ON book.isbn = staging.isbn"
+            ))
+            await db.commit()
+        except IntegrityError as exc:
+            # batches already committed stay written, so this one is reported rather than raised
+            await db.rollback()
+            error = f"Batch rejected by the database: {exc.orig}"
+            report.errors.extend(BookImportError(row=rows[isbn], isbn=isbn, errors=[error]) for isbn in books)
+            return
+        except Exception:
+            await db.rollback()
+            raise
+
+        await invalidate_books(*(row.id for row in merged if not row.created))
+        report.created += created
+        report.updated += len(books) - created
+
+
+async def _read_file(path: str) -> AsyncIterator[bytes]:
+    with open(path, "rb") if path != "-" else sys.stdin.buffer as source:
+        while chunk := source.read(1 << 16):
+            yield chunk
+
+
+async def _main(path: str, format: DataFormat, batch_size: int) -> BookImportReport:
+    async with AsyncSessionLocal() as session:
+        records = parse_records(iter_lines(_read_file(path)), format)
+        return await BookImportService.import_books(session, records, batch_size)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk import books from CSV or NDJSON")
+    parser.add_argument("path", help="file to import, or - for stdin")
+    parser.add_argument("--format", type=DataFormat, choices=list(DataFormat))
+    parser.add_argument("--batch-size", type=int, default=settings.BOOK_IMPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    format = args.format or (DataFormat.NDJSON if args.path.endswith((".ndjson", ".jsonl")) else DataFormat.CSV)
+    report = asyncio.run(_main(args.path, format, args.batch_size))
+    print(report.model_dump_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,20 @@
 from typing import Optional, Any, List
 from pydantic import Field
 from pydantic.utils import GetterDict
-from sqlalchemy import Column, ForeignKey, Integer, String, null
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, ForeignKey, Index, Integer, String, null, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.util import FastIntFlag
 from src.base import PrimaryKeyMixin, TimeStampMixin
 from src.schemas import BookTankBase
+from src.enums import BookSortField, SortOrder
 from src.database.core import Base
 from sqlalchemy.ext.associationproxy import association_proxy
 
+# text search configuration used both by the generated column and by queries against it
+BOOK_SEARCH_CONFIG = 'simple'
+
+
 class BookAuthor(Base):
     book_id = Column(ForeignKey('book.id'), primary_key=True)
     author_id = Column(ForeignKey('author.user_id'), primary_key=True)
@@ -21,6 +27,10 @@ class BookAuthor(Base):
     author_name = association_proxy(target_collection='author', attr='name')
     book_title = association_proxy(target_collection='book', attr='title')
 
+    __table_args__ = (
+        Index("ix_book_author_author_id_book_id", "author_id", "book_id"),
+    )
+
 class Gener(Base, PrimaryKeyMixin):
     name = Column(String, nullable=False)
 
@@ -31,8 +41,27 @@ class Book(Base, PrimaryKeyMixin, TimeStampMixin):
     gener = Column(Integer, ForeignKey('gener.id'), nullable=False)
     description = Column(String(2056), nullable=True)
     unit = Column(Integer, default=0, nullable=False)
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{BOOK_SEARCH_CONFIG}', coalesce(description, '')), 'B')",
+            persisted=True,
+        ),
+    ))
 
-    authors = relationship("BookAuthor", back_populates="book")
+    authors = relationship("BookAuthor", back_populates="book", cascade="all, delete-orphan")
+
+    # composite indexes backing the search filters, each ending with id for keyset paging
+    __table_args__ = (
+        Index("ix_book_gener_price_id", "gener", "price", "id"),
+        Index("ix_book_gener_created_at_id", "gener", "created_at", "id"),
+        Index("ix_book_price_id", "price", "id"),
+        Index("ix_book_created_at_id", "created_at", "id"),
+        Index("ix_book_in_stock_price_id", "price", "id", postgresql_where=text("unit > 0")),
+        Index("ix_book_in_stock_created_at_id", "created_at", "id", postgresql_where=text("unit > 0")),
+        Index("ix_book_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
 class BookCreateSchema(BookTankBase):
     title: str = Field(..., max_length=255)
@@ -44,6 +73,17 @@ class BookCreateSchema(BookTankBase):
     author_ids: List[int]
     blurbs: List[str]
 
+class BookFilter(BookTankBase):
+    q: Optional[str] = Field(None, min_length=1, max_length=255)
+    gener: Optional[int] = None
+    author_id: Optional[int] = None
+    min_price: Optional[int] = Field(None, ge=0)
+    max_price: Optional[int] = Field(None, ge=0)
+    in_stock: Optional[bool] = None
+    # defaults to relevance when searching by text, created_at otherwise
+    sort: Optional[BookSortField] = None
+    order: SortOrder = SortOrder.DESC
+
 class AuthorResponse(BookTankBase):
     user_id: int
     city: Optional[int]
@@ -70,6 +110,20 @@ class BookResponse(BookTankBase):
     unit: int
     authors: List[BookAuthorResponse]
 
+class BookImportError(BookTankBase):
+    row: int
+    isbn: Optional[str] = None
+    errors: List[str]
+
+class BookImportReport(BookTankBase):
+    total: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[BookImportError] = []
+    elapsed_seconds: float = 0
+    rows_per_second: float = 0
+
 class UpdateBookSchema(BookCreateSchema):
     title: Optional[str] = None
     isbn: Optional[str] = None
@@ -1,11 +1,20 @@
-from typing import List
-from sqlalchemy import delete, select
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import Integer, Row, column, delete, func, literal_column, select, tuple_, update, values
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from fastapi import HTTPException
-from .models import Book, BookAuthor, BookCreateSchema, Gener, UpdateBookSchema
+from src.cache import CachedResponse
+from src.enums import BookSortField, SortOrder
+from src.pagination import Page
+from .cache import BOOK_LIST_NAMESPACE, book_cache, book_list_key, book_namespace, invalidate_books
+from .models import BOOK_SEARCH_CONFIG, Book, BookAuthor, BookCreateSchema, BookFilter, BookResponse, Gener, UpdateBookSchema
 from src.profile.models import Author
-from src.database.core import DbSession
+from src.config import settings
+from src.database.core import AsyncSessionLocal, DbSession, is_replica
+from src.database.lookups import row_exists, rows_exist
+from src.pagination import decode_cursor, encode_cursor
 
 
 async def create_book_author(*, db: DbSession, book_id: int, author_id: int, blurb: str) -> BookAuthor:
@@ -21,6 +30,10 @@ async def get_by_isbn(*, db_session: DbSession, isbn: str) -> Book | None:
     return result.scalar_one_or_none()
 
 class GenerService:
+    @staticmethod
+    async def exists(db: DbSession, gener_id: int) -> bool:
+        return await row_exists(db, Gener.id == gener_id)
+
     @staticmethod
     async def get_gener(db: DbSession, gener_id: int):
         result = await db.execute(select(Gener).filter(Gener.id == gener_id))
@@ -30,131 +43,312 @@ class GenerService:
         return gener
 
 
+# the columns of a BookResponse; the search vector and timestamps stay in the database
+BOOK_RESPONSE_COLUMNS = (Book.id, Book.title, Book.isbn, Book.price, Book.gener, Book.description, Book.unit)
+
+
+def replica_cache_ttl(db: DbSession) -> Optional[float]:
+    # a lagging replica can serve rows older than the last invalidation, so what it
+    # returns is only cached for as long as writers are kept on the primary
+    return settings.REPLICA_STICKY_SECONDS if is_replica(db) else None
+
+
 class BookService:
-    
+
     @staticmethod
-    async def create_book(db: DbSession, book_data: BookCreateSchema, author_ids: List[int], blurbs: List[str]):
-        # Check if ISBN is already taken
-        if await get_by_isbn(db_session=db, isbn=book_data.isbn):
-            raise HTTPException(status_code=400, detail=f"Book with ISBN {book_data.isbn} already exists")
+    async def exists(db: DbSession, book_id: int) -> bool:
+        return await row_exists(db, Book.id == book_id)
 
-        if await GenerService.get_gener(db, book_data.gener) is None:
-            raise HTTPException(status_code=404, detail="Gener not found")
+    @staticmethod
+    async def take_unit(db: DbSession, book_id: int) -> int:
+        """Atomically takes one copy of a book out of stock, inside the caller's transaction.
+
+        Returns the book's price, so reservations can be priced without another query.
+        """
+        result = await db.execute(
+            update(Book)
+            .where(Book.id == book_id, Book.unit > 0)
+            .values(unit=Book.unit - 1)
+            .returning(Book.price)
+        )
+        price = result.scalar_one_or_none()
+        if price is None:
+            if not await BookService.exists(db, book_id):
+                raise HTTPException(status_code=404, detail="Book not found")
+            raise HTTPException(status_code=409, detail="Book is out of stock")
+        return price
+
+    @staticmethod
+    async def lock_books(db: DbSession, book_ids: Iterable[int]) -> Dict[int, Row]:
+        """Locks the given books and returns their stock and price, in id order so batches cannot deadlock."""
+        result = await db.execute(
+            select(Book.id, Book.unit, Book.price)
+            .where(Book.id.in_(set(book_ids)))
+            .order_by(Book.id)
+            .with_for_update()
+        )
+        return {row.id: row for row in result}
+
+    @staticmethod
+    async def take_units(db: DbSession, counts: Dict[int, int]) -> None:
+        """Takes `counts[book_id]` copies of every book with one multi-row UPDATE, inside the caller's transaction.
+
+        The books must already be locked with enough stock, see `lock_books`.
+        """
+        taken = values(column("book_id", Integer), column("count", Integer), name="taken").data(list(counts.items()))
+        await db.execute(
+            update(Book).where(Book.id == taken.c.book_id).values(unit=Book.unit - taken.c.count)
+        )
+
+    @staticmethod
+    async def release_unit(db: DbSession, book_id: int) -> None:
+        """Puts one copy of a book back in stock, inside the caller's transaction."""
+        await db.execute(update(Book).where(Book.id == book_id).values(unit=Book.unit + 1))
+
+    @staticmethod
+    async def _load_authors(db: DbSession, author_ids: List[int]) -> dict:
+        """Loads the given authors in one query, failing on the first unknown id."""
+        result = await db.execute(select(Author).where(Author.user_id.in_(author_ids)))
+        author_dict = {author.user_id: author for author in result.scalars().all()}
+        for author_id in author_ids:
+            if author_id not in author_dict:
+                raise HTTPException(status_code=404, detail=f"Author with ID {author_id} not found")
+        return author_dict
 
+    @staticmethod
+    async def create_book(db: DbSession, book_data: BookCreateSchema, author_ids: List[int], blurbs: List[str]):
         # Ensure each author has a matching blurb
         if len(author_ids) != len(blurbs):
             raise HTTPException(status_code=400, detail="Each author must have a corresponding blurb")
 
-        # Create the Book instance
+        # Check ISBN uniqueness and the gener in a single round trip
+        found = await rows_exist(db, isbn=Book.isbn == book_data.isbn, gener=Gener.id == book_data.gener)
+        if found["isbn"]:
+            raise HTTPException(status_code=400, detail=f"Book with ISBN {book_data.isbn} already exists")
+        if not found["gener"]:
+            raise HTTPException(status_code=404, detail="Gener not found")
+
+        author_dict = await BookService._load_authors(db, author_ids)
+
+        # The book and its BookAuthor rows are flushed together and committed once, so a
+        # failure leaves nothing behind and the response is built from what is in memory
         book = Book(**book_data.model_dump(exclude={'author_ids', 'blurbs'}))
+        book.authors = [
+            BookAuthor(author=author_dict[author_id], blurb=blurb)
+            for author_id, blurb in zip(author_ids, blurbs)
+        ]
         db.add(book)
-        await db.commit()
-        await db.refresh(book)
-
-        # Preload all authors in a single query
-        authors = await db.execute(select(Author).where(Author.user_id.in_(author_ids)))
-        author_dict = {author.user_id: author for author in authors.scalars().all()}
-
-        # Create BookAuthor records
-        book_authors = []
-        for author_id, blurb in zip(author_ids, blurbs):
-            author = author_dict.get(author_id)
-            if not author:
-                raise HTTPException(status_code=404, detail=f"Author with ID {author_id} not found")
-            book_authors.append(BookAuthor(book_id=book.id, author_id=author_id, blurb=blurb))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Book conflicts with an existing book or author link")
+        await invalidate_books(book.id)
+        return book
+
+    @staticmethod
+    async def _with_authors(db: DbSession, rows: Sequence[Row]) -> List[dict]:
+        """Turns projected book rows into `BookResponse` shaped dicts, authors fetched in one query."""
+        books = {row.id: {**row._mapping, "authors": []} for row in rows}
+        if books:
+            links = await db.execute(
+                select(BookAuthor.book_id, BookAuthor.blurb, Author.user_id, Author.city, Author.bank_number)
+                .join(Author, Author.user_id == BookAuthor.author_id)
+                .where(BookAuthor.book_id.in_(books))
+            )
+            for link in links:
+                book = books[link.book_id]
+                book["authors"].append({
+                    "author": {"user_id": link.user_id, "city": link.city, "bank_number": link.bank_number},
+                    "blurb": link.blurb,
+                    "book_title": book["title"],
+                })
+        return list(books.values())
 
-        db.add_all(book_authors)
-        await db.commit()
+    @staticmethod
+    async def get_books_page(db: DbSession, limit: int, cursor: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+        # Keyset pagination on the primary key, one extra row tells us whether a next page exists
+        stmt = select(*BOOK_RESPONSE_COLUMNS).order_by(Book.id).limit(limit + 1)
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            stmt = stmt.where(Book.id > last_id)
 
-        # Eagerly load the Book again with authors to avoid lazy-loading issues
-        result = await db.execute(
-            select(Book)
-            .options(selectinload(Book.authors).selectinload(BookAuthor.author))
-            .filter(Book.id == book.id)
-        )
-        book_loaded = result.scalars().first()
-        return book_loaded
+        rows = (await db.execute(stmt)).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].id)
+        return await BookService._with_authors(db, rows), next_cursor
 
     @staticmethod
-    async def get_all_books(db: DbSession):
-        result = await db.execute(select(Book).options(selectinload(Book.authors).selectinload(BookAuthor.author)))
-        return result.scalars().all()
+    async def search_books(
+        db: DbSession, filters: BookFilter, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[dict], Optional[str]]:
+        sort = filters.sort or (BookSortField.RELEVANCE if filters.q else BookSortField.CREATED_AT)
+        if sort == BookSortField.RELEVANCE and not filters.q:
+            raise HTTPException(status_code=400, detail="Sorting by relevance requires a search query")
+
+        query = func.websearch_to_tsquery(BOOK_SEARCH_CONFIG, filters.q) if filters.q else None
+
+        # Keyset on (sort key, id) so deep pages cost the same as the first one
+        if sort == BookSortField.RELEVANCE:
+            sort_key, cast = func.ts_rank_cd(Book.search_vector, query), float
+        elif sort == BookSortField.PRICE:
+            sort_key, cast = Book.price, int
+        else:
+            sort_key, cast = Book.created_at, datetime.fromisoformat
+
+        stmt = select(*BOOK_RESPONSE_COLUMNS, sort_key.label("sort_key"))
+
+        if query is not None:
+            stmt = stmt.where(Book.search_vector.bool_op("@@")(query))
+        if filters.gener is not None:
+            stmt = stmt.where(Book.gener == filters.gener)
+        if filters.author_id is not None:
+            stmt = stmt.where(
+                Book.id.in_(select(BookAuthor.book_id).where(BookAuthor.author_id == filters.author_id))
+            )
+        if filters.min_price is not None:
+            stmt = stmt.where(Book.price >= filters.min_price)
+        if filters.max_price is not None:
+            stmt = stmt.where(Book.price <= filters.max_price)
+        if filters.in_stock is not None:
+            # inlined literal so the planner can match the partial `unit > 0` indexes
+            stmt = stmt.where(Book.unit > literal_column("0") if filters.in_stock else Book.unit == 0)
+
+        descending = filters.order == SortOrder.DESC
+        if cursor:
+            last_value, last_id = decode_cursor(cursor, cast, int)
+            key, position = tuple_(sort_key, Book.id), tuple_(last_value, last_id)
+            stmt = stmt.where(key < position if descending else key > position)
+
+        if descending:
+            stmt = stmt.order_by(sort_key.desc(), Book.id.desc())
+        else:
+            stmt = stmt.order_by(sort_key, Book.id)
+
+        result = await db.execute(stmt.limit(limit + 1))
+        rows = result.all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].sort_key, rows[-1].id)
+        return await BookService._with_authors(db, rows), next_cursor
 
     @staticmethod
-    async def get_book(db: DbSession, book_id: int):
-        result = await db.execute(
-            select(Book)
-            .options(selectinload(Book.authors).selectinload(BookAuthor.author))
-            .filter(Book.id == book_id)
-        )
-        book = result.scalars().first()
-        if not book:
+    async def stream_books(chunk_size: int, session_factory: async_sessionmaker = AsyncSessionLocal) -> AsyncIterator[bytes]:
+        # The response outlives the request scoped session, so the stream owns its own one
+        async with session_factory() as session:
+            result = await session.stream(
+                select(*BOOK_RESPONSE_COLUMNS).order_by(Book.id).execution_options(yield_per=chunk_size)
+            )
+            async for rows in result.partitions():
+                books = await BookService._with_authors(session, rows)
+                yield b"".join(
+                    BookResponse.model_validate(book).model_dump_json().encode("utf-8") + b"\n"
+                    for book in books
+                )
+
+    @staticmethod
+    async def get_book_json(db: DbSession, book_id: int) -> CachedResponse:
+        """Read-through cached `BookResponse` body of one book."""
+        namespace = book_namespace(book_id)
+        entry = await book_cache.get(namespace)
+        if entry is None:
+            version = await book_cache.version(namespace)
+            book = await BookService.get_book(db, book_id)
+            body = BookResponse.model_validate(book).model_dump_json().encode("utf-8")
+            entry = await book_cache.set(namespace, body, namespace=namespace, version=version, ttl=replica_cache_ttl(db))
+        return entry
+
+    @staticmethod
+    async def get_books_page_json(db: DbSession, limit: int, cursor: Optional[str] = None) -> CachedResponse:
+        """Read-through cached body of one catalog page."""
+        key = await book_list_key(limit, cursor)
+        entry = await book_cache.get(key)
+        if entry is None:
+            version = await book_cache.version(BOOK_LIST_NAMESPACE)
+            books, next_cursor = await BookService.get_books_page(db, limit, cursor)
+            page = Page[BookResponse].model_validate({"items": books, "next_cursor": next_cursor})
+            entry = await book_cache.set(
+                key, page.model_dump_json().encode("utf-8"),
+                namespace=BOOK_LIST_NAMESPACE, version=version, ttl=replica_cache_ttl(db),
+            )
+        return entry
+
+    @staticmethod
+    async def get_book(db: DbSession, book_id: int) -> dict:
+        row = (await db.execute(select(*BOOK_RESPONSE_COLUMNS).where(Book.id == book_id))).first()
+        if not row:
             raise HTTPException(status_code=404, detail="Book not found")
+        (book,) = await BookService._with_authors(db, [row])
         return book
 
     @staticmethod
     async def update_book(db: DbSession, book_id: int, book_data: UpdateBookSchema):
+        if book_data.author_ids is not None and len(book_data.author_ids) != len(book_data.blurbs or []):
+            raise HTTPException(status_code=400, detail="Each author must have a corresponding blurb")
+
         result = await db.execute(
-            select(Book).options(selectinload(Book.authors)).filter(Book.id == book_id)
+            select(Book)
+            .options(joinedload(Book.authors).joinedload(BookAuthor.author))
+            .filter(Book.id == book_id)
         )
-        book = result.scalars().first()
+        book = result.unique().scalars().first()
         if not book:
             raise HTTPException(status_code=404, detail="Book not found")
 
-        if book_data.gener is not None and await GenerService.get_gener(db, book_data.gener) is None:
-            raise HTTPException(status_code=404, detail="Gener not found")
-        # Check if new ISBN is unique
+        # Check the gener and the new ISBN's uniqueness in a single round trip
+        checks = {}
+        if book_data.gener is not None:
+            checks["gener"] = Gener.id == book_data.gener
         if book_data.isbn:
-            existing_book = await db.execute(select(Book).filter(Book.isbn == book_data.isbn, Book.id != book_id))
-            if existing_book.scalars().first():
+            checks["isbn"] = (Book.isbn == book_data.isbn) & (Book.id != book_id)
+        if checks:
+            found = await rows_exist(db, **checks)
+            if "gener" in found and not found["gener"]:
+                raise HTTPException(status_code=404, detail="Gener not found")
+            if found.get("isbn"):
                 raise HTTPException(status_code=400, detail="ISBN must be unique")
 
+        # Queries come before any change so autoflush does not split the UPDATE
+        if book_data.author_ids is not None:
+            author_dict = await BookService._load_authors(db, book_data.author_ids)
+
         # Update fields if provided
-        for field, value in book_data.model_dump(exclude_unset=True).items():
+        for field, value in book_data.model_dump(exclude_unset=True, exclude={'author_ids', 'blurbs'}).items():
             setattr(book, field, value)
-        
-        await db.commit()
-        await db.refresh(book)
-
 
+        # Replacing the collection lets the flush delete the old links and insert the new ones
         if book_data.author_ids is not None:
-            await db.execute(delete(BookAuthor).where(BookAuthor.book_id == book_id))
-            await db.commit()
-
-        # Update authors if provided
-        if book_data.author_ids and book_data.blurbs:
-            if len(book_data.author_ids) != len(book_data.blurbs):
-                raise HTTPException(status_code=400, detail="Each author must have a corresponding blurb")
-
-            # Add new author relationships
-            for author_id, blurb in zip(book_data.author_ids, book_data.blurbs):
-                book_author = BookAuthor(book_id=book_id, author_id=author_id, blurb=blurb)
-                db.add(book_author)
+            book.authors = [
+                BookAuthor(author=author_dict[author_id], blurb=blurb)
+                for author_id, blurb in zip(book_data.author_ids, book_data.blurbs)
+            ]
 
+        try:
             await db.commit()
-            await db.flush()
-        result = await db.execute(
-            select(Book)
-            .options(selectinload(Book.authors).selectinload(BookAuthor.author))
-            .filter(Book.id == book.id)
-        )
-        book_loaded = result.scalars().first()
-        return book_loaded
-    
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Book conflicts with an existing book or author link")
+        await invalidate_books(book_id)
+        return book
+
     @staticmethod
     async def delete_book(db: DbSession, book_id: int):
-        # First, fetch the book to ensure it exists
-        result = await db.execute(select(Book).filter(Book.id == book_id))
-        book = result.scalars().first()
-        if not book:
-            raise HTTPException(status_code=404, detail="Book not found")
-
-        # Delete related BookAuthor entries
-        await db.execute(delete(BookAuthor).where(BookAuthor.book_id == book_id))
-        await db.commit()
-
-        # Now delete the book itself
-        await db.execute(delete(Book).where(Book.id == book_id))
-        await db.commit()
+        # Both deletes run in one transaction, RETURNING tells us whether the book existed
+        try:
+            await db.execute(delete(BookAuthor).where(BookAuthor.book_id == book_id))
+            result = await db.execute(delete(Book).where(Book.id == book_id).returning(Book.id))
+            if result.scalar_one_or_none() is None:
+                raise HTTPException(status_code=404, detail="Book not found")
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail="Cannot delete a book that has reservations")
+        except HTTPException:
+            await db.rollback()
+            raise
 
+        await invalidate_books(book_id)
         return {"detail": "Book deleted successfully"}
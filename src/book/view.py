@@ -1,18 +1,25 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
 from src.auth.service import CurrentUser
 from src.auth.dependencies import admin_permission, author_or_admin_permissasion
 
+from .cache import cached_response
+from .importer import BookImportService, iter_lines, parse_records
 from .service import BookService, get_by_isbn
-from src.database.core import DbSession
-from src.enums import UserRoles
-from .models import Book, BookCreateSchema, BookResponse, UpdateBookSchema
+from src.config import settings
+from src.database.core import DbSession, ReadDbSession, read_sessionmaker
+from src.enums import DataFormat, UserRoles
+from src.pagination import Page
+from src.responses import FastJSONResponse, JSONSerializer
+from .models import Book, BookCreateSchema, BookFilter, BookImportReport, BookResponse, UpdateBookSchema
 
 
-book_router = APIRouter(prefix="/book", tags=["book"])
+book_router = APIRouter(prefix="/book", tags=["book"], default_response_class=FastJSONResponse)
+book_page_serializer = JSONSerializer(Page[BookResponse])
 
 @book_router.post("/", response_model=BookResponse, dependencies=[Depends(author_or_admin_permissasion)]) 
 async def create_book(book_data: BookCreateSchema, db: DbSession, user: CurrentUser):
@@ -21,15 +28,48 @@ async def create_book(book_data: BookCreateSchema, db: DbSession, user: CurrentU
         book_data.blurbs = [user.first_name]
     book = await BookService.create_book(db, book_data, book_data.author_ids, book_data.blurbs)
     return book
+
+@book_router.post("/import", response_model=BookImportReport, dependencies=[Depends(admin_permission)])
+async def import_books(
+    request: Request,
+    db: DbSession,
+    format: DataFormat = DataFormat.CSV,
+    batch_size: int = Query(settings.BOOK_IMPORT_BATCH_SIZE, ge=1, le=50000),
+):
+    # the body is parsed as it arrives, so large files are never held in memory at once
+    records = parse_records(iter_lines(request.stream()), format)
+    return await BookImportService.import_books(db, records, batch_size)
+
+@book_router.get("/search", response_model=Page[BookResponse])
+async def search_books(
+    db: ReadDbSession,
+    filters: BookFilter = Depends(),
+    limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    db_books, next_cursor = await BookService.search_books(db, filters, limit, cursor)
+    return book_page_serializer.response({"items": db_books, "next_cursor": next_cursor})
+
 @book_router.get("/{id}", response_model=BookResponse)
-async def get_book(id: int, db: DbSession):
-    db_book = await BookService.get_book(db, id)
-    return db_book
-
-@book_router.get("/", response_model=List[BookResponse])
-async def get_books(db: DbSession):
-    db_books = await BookService.get_all_books(db)
-    return db_books
+async def get_book(id: int, request: Request, db: ReadDbSession):
+    entry = await BookService.get_book_json(db, id)
+    return cached_response(request, entry)
+
+@book_router.get("/", response_model=Page[BookResponse])
+async def get_books(
+    request: Request,
+    db: ReadDbSession,
+    limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+):
+    if stream:
+        return StreamingResponse(
+            BookService.stream_books(settings.STREAM_CHUNK_SIZE, read_sessionmaker(request)),
+            media_type="application/x-ndjson",
+        )
+    entry = await BookService.get_books_page_json(db, limit, cursor)
+    return cached_response(request, entry)
 
 @book_router.put("/{id}", response_model=BookResponse)
 async def update_book(id: int, book_data: UpdateBookSchema, db: DbSession):
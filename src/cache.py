@@ -0,0 +1,170 @@
+import hashlib
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, NamedTuple, Optional
+
+
+class TTLCache:
+    """Least recently used cache whose entries also expire after a time to live."""
+
+    def __init__(self, maxsize: int, ttl: float, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        value, expires_at = entry
+        if expires_at <= self.timer():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (value, self.timer() + ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry[1] > self.timer()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
+
+
+class CacheBackend(ABC):
+    """Byte store behind `ResponseCache`; a Redis-like client can implement the same calls."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        pass
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        pass
+
+    @abstractmethod
+    async def get_counter(self, key: str) -> int:
+        pass
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU backend, private to each worker process."""
+
+    def __init__(self, maxsize: int):
+        self._cache = TTLCache(maxsize=maxsize, ttl=float("inf"))
+        self._counters: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._cache.set(key, value, ttl=ttl)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.pop(key)
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class CachedResponse(NamedTuple):
+    etag: str
+    body: bytes
+
+
+class ResponseCache:
+    """Read-through cache of serialized response bodies with strong ETags.
+
+    Entries belong to a namespace whose version is bumped on every write. Readers
+    capture the version before going to the database and only store what they read
+    if no write happened meanwhile, so a slow reader cannot resurrect stale data.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        value = await self.backend.get(key)
+        if value is None:
+            return None
+        etag, _, body = value.partition(b"\n")
+        return CachedResponse(etag.decode("ascii"), body)
+
+    async def version(self, namespace: str) -> int:
+        return await self.backend.get_counter(f"version:{namespace}")
+
+    async def set(
+        self,
+        key: str,
+        body: bytes,
+        namespace: Optional[str] = None,
+        version: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ) -> CachedResponse:
+        entry = CachedResponse(make_etag(body), body)
+        if namespace is None or await self.version(namespace) == version:
+            ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+            await self.backend.set(key, entry.etag.encode("ascii") + b"\n" + body, ttl)
+        return entry
+
+    async def invalidate(self, namespace: str, *keys: str) -> None:
+        await self.backend.incr(f"version:{namespace}")
+        if keys:
+            await self.backend.delete(*keys)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluates an If-None-Match header against a strong ETag."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
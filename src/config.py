@@ -1,13 +1,64 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     DATABASE_URL: str
+    # optional streaming replica serving the read-only endpoints
+    DATABASE_REPLICA_URL: Optional[str] = None
+    REPLICA_STICKY_SECONDS: float = 5
+    REPLICA_RETRY_SECONDS: float = 10
     APP_ENV: str = "development"
     DEBUG: bool = False
     JWT_SECRET: str
     JWT_ALG: str
     JWT_EXP: int
 
+    # the production server runs one worker per core unless WEB_CONCURRENCY says otherwise;
+    # every worker has its own database pool of DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    WEB_CONCURRENCY: Optional[int] = None
+    SERVER_KEEPALIVE: int = 5
+    SERVER_BACKLOG: int = 2048
+    SERVER_TIMEOUT: int = 60
+    SERVER_GRACEFUL_TIMEOUT: int = 30
+    SERVER_MAX_REQUESTS: int = 0
+    SERVER_MAX_REQUESTS_JITTER: int = 0
+
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_CONNECT_TIMEOUT: float = 5
+    # set when connecting through pgbouncer in transaction pooling mode
+    DB_PGBOUNCER_MODE: bool = False
+
+    PAGE_SIZE: int = 50
+    MAX_PAGE_SIZE: int = 500
+    STREAM_CHUNK_SIZE: int = 1000
+    BOOK_IMPORT_BATCH_SIZE: int = 5000
+    BOOK_CACHE_SIZE: int = 10000
+    # the book cache lives in each worker and a write only invalidates the worker that took it,
+    # so the others may serve the old body and answer its ETag with 304 for up to this long
+    BOOK_CACHE_TTL: int = 60
+    AVAILABILITY_MAX_BOOKS: int = 100
+    QUOTE_MAX_ITEMS: int = 500
+    RESERVE_BATCH_MAX_ITEMS: int = 100
+
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL: int = 30
+
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    PASSWORD_HASH_PROCESSES: bool = False
+
+    # statement level profiling, too chatty to leave on outside development
+    QUERY_PROFILING: bool = False
+    SLOW_QUERY_MS: float = 200
+    N_PLUS_ONE_THRESHOLD: int = 5
+
     class Config:
         env_file = ".env"
 
@@ -1,10 +1,11 @@
 import re
 from typing import Annotated, AsyncGenerator
+from uuid import uuid4
 
-from fastapi import Depends
+from fastapi import Depends, Request
 from sqlalchemy import create_engine, inspect, Column, Integer, DateTime
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker,AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker,AsyncSession
 from sqlalchemy.ext.declarative import declarative_base, declared_attr
 from sqlalchemy.sql.functions import current_timestamp 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
@@ -12,12 +13,45 @@ from sqlalchemy.orm import sessionmaker
 from fastapi import Depends
 
 
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+
 from src.config import settings
+from .pool import InstrumentedPool
+from .replica import prefers_primary, replica_health
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_async_engine(DATABASE_URL)
-SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def create_engine_from_settings(url: str, name: str) -> AsyncEngine:
+    """Creates an async engine whose pool is sized and instrumented from the settings."""
+    connect_args = {"timeout": settings.DB_CONNECT_TIMEOUT}
+    if settings.DB_PGBOUNCER_MODE:
+        # pgbouncer in transaction mode may run each statement on a different server
+        # connection, so prepared statements can be neither cached nor reused by name
+        connect_args.update(
+            statement_cache_size=0,
+            prepared_statement_cache_size=0,
+            prepared_statement_name_func=lambda: f"__asyncpg_{uuid4()}__",
+        )
+
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_logging_name=name,
+        connect_args=connect_args,
+    )
+
+
+engine = create_engine_from_settings(DATABASE_URL, "primary")
+replica_engine = (
+    create_engine_from_settings(settings.DATABASE_REPLICA_URL, "replica")
+    if settings.DATABASE_REPLICA_URL else None
+)
 
 
 def resolve_table_name(name):
@@ -40,7 +74,7 @@ class CustomBase:
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
 
 
-AsyncSessionLocal = sessionmaker(
+AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False
@@ -57,4 +91,55 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 DbSession = Annotated[AsyncSession, Depends(get_db)]
 
 
+class ReplicaSession(Session):
+    """Sync side of a replica read session, falling back to the primary when the replica cannot be reached.
+
+    Statements, `get`, `refresh` and `connection()` all check their connection out through
+    `_connection_for_bind`, so the fallback lives there; nothing connects before the first of
+    them, and a request answered from a cache never touches a database.
+    """
+
+    def _connection_for_bind(self, bind, execution_options=None, **kw):
+        try:
+            return super()._connection_for_bind(bind, execution_options, **kw)
+        except (DBAPIError, OSError, PoolTimeoutError):
+            if bind is not replica_engine.sync_engine:
+                raise
+            replica_health.mark_down()
+            self.bind = engine.sync_engine
+            return super()._connection_for_bind(self.bind, execution_options, **kw)
+
+
+ReplicaSessionLocal = async_sessionmaker(
+    bind=replica_engine,
+    class_=AsyncSession,
+    sync_session_class=ReplicaSession,
+    expire_on_commit=False
+) if replica_engine is not None else None
+
+
+def read_sessionmaker(request: Request) -> async_sessionmaker:
+    """Session factory for reads: the replica when there is a healthy one and the client has no recent write."""
+    if ReplicaSessionLocal is None or not replica_health.available or prefers_primary(request):
+        return AsyncSessionLocal
+    return ReplicaSessionLocal
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    session = read_sessionmaker(request)()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+def is_replica(session: AsyncSession) -> bool:
+    # the sync session's bind, which a replica session moves to the primary when it falls back
+    return replica_engine is not None and session.sync_session.bind is replica_engine.sync_engine
+
+
+# read-only endpoints; may lag behind the primary by the replication delay
+ReadDbSession = Annotated[AsyncSession, Depends(get_read_db)]
+
+
 Base = declarative_base(cls=CustomBase)
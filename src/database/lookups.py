@@ -0,0 +1,18 @@
+from typing import Dict
+
+from sqlalchemy import exists, select
+from sqlalchemy.sql import ColumnElement
+
+from .core import DbSession
+
+
+async def row_exists(db_session: DbSession, criterion: ColumnElement) -> bool:
+    """Returns whether any row matches the criterion with a `SELECT EXISTS`, loading nothing."""
+    return bool(await db_session.scalar(select(exists().where(criterion))))
+
+
+async def rows_exist(db_session: DbSession, **criteria: ColumnElement) -> Dict[str, bool]:
+    """Checks several existence criteria in a single round trip, keyed by argument name."""
+    stmt = select(*(exists().where(criterion).label(name) for name, criterion in criteria.items()))
+    result = await db_session.execute(stmt)
+    return dict(result.one()._mapping)
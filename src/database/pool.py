@@ -0,0 +1,76 @@
+import time
+import weakref
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.metrics.registry import CallbackGauge, registry
+
+
+pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent checking out a connection, including waits and new connects",
+    labels=("pool",),
+)
+pool_checkout_timeouts = registry.counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after pool_timeout",
+    labels=("pool",),
+)
+pool_connects = registry.counter(
+    "db_pool_connects_total",
+    "New DBAPI connections opened by the pool",
+    labels=("pool",),
+)
+pool_invalidations = registry.counter(
+    "db_pool_invalidations_total",
+    "Pooled connections discarded as invalid",
+    labels=("pool",),
+)
+
+_pools: "weakref.WeakSet[InstrumentedPool]" = weakref.WeakSet()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait and how often they time out."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools.add(self)
+        # a recreated pool inherits the listeners of the one it replaces
+        if "_dispatch" not in kwargs:
+            event.listen(self, "connect", self._on_connect)
+            event.listen(self, "invalidate", self._on_invalidate)
+
+    @property
+    def label(self) -> str:
+        return self.logging_name or "default"
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        pool_connects.inc(pool=self.label)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        pool_invalidations.inc(pool=self.label)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_checkout_timeouts.inc(pool=self.label)
+            raise
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - started, pool=self.label)
+
+
+def _pool_gauge(attribute: str):
+    def collect():
+        return {(pool.label,): getattr(pool, attribute)() for pool in list(_pools)}
+    return collect
+
+
+registry.register(CallbackGauge("db_pool_size", "Configured pool size", _pool_gauge("size"), labels=("pool",)))
+registry.register(CallbackGauge("db_pool_checked_out", "Connections currently checked out", _pool_gauge("checkedout"), labels=("pool",)))
+registry.register(CallbackGauge("db_pool_checked_in", "Idle connections in the pool", _pool_gauge("checkedin"), labels=("pool",)))
+registry.register(CallbackGauge("db_pool_overflow", "Connections opened beyond pool_size", _pool_gauge("overflow"), labels=("pool",)))
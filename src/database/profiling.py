@@ -0,0 +1,143 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.config import settings
+from src.metrics.middleware import route_of
+
+
+logger = logging.getLogger("src.database.profiling")
+
+# runs of bound parameters, e.g. an expanded IN list, collapse to one placeholder
+_PARAMS_RE = re.compile(r"(?:\$\d+|%\([^)]+\)s|\?)(?:\s*,\s*(?:\$\d+|%\([^)]+\)s|\?))*")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    return _PARAMS_RE.sub("?", _SPACE_RE.sub(" ", statement).strip())
+
+
+class QueryRecord(NamedTuple):
+    statement: str
+    parameters: Any
+    duration: float
+
+
+class QueryProfile:
+    """Statements issued while a request, or a block of test code, was running."""
+
+    def __init__(self, scope: Optional[dict] = None, label: str = "none"):
+        self.scope = scope
+        self.label = label
+        self.queries: List[QueryRecord] = []
+
+    @property
+    def route(self) -> str:
+        return route_of(self.scope) if self.scope is not None else self.label
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def duration(self) -> float:
+        return sum(query.duration for query in self.queries)
+
+    def repeated(self, threshold: int = None) -> Dict[str, int]:
+        """Statement shapes issued at least ``threshold`` times, the usual N+1 signature."""
+        threshold = threshold or settings.N_PLUS_ONE_THRESHOLD
+        shapes = Counter(statement_shape(query.statement) for query in self.queries)
+        return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+    def report(self) -> dict:
+        return {
+            "route": self.route,
+            "queries": self.count,
+            "duration_ms": round(self.duration * 1000, 3),
+            "repeated": self.repeated(),
+            "statements": [statement_shape(query.statement) for query in self.queries],
+        }
+
+    def assert_budget(self, max_queries: int) -> None:
+        if self.count > max_queries:
+            lines = "\n".join(f"  {shape}" for shape in self.report()["statements"])
+            raise AssertionError(
+                f"{self.route} issued {self.count} queries, budget is {max_queries}:\n{lines}"
+            )
+
+
+current_profile: ContextVar[Optional[QueryProfile]] = ContextVar("current_profile", default=None)
+
+
+@contextmanager
+def profile_queries(label: str = "test"):
+    """Collects the statements run inside the block; meant for query budget checks in tests.
+
+        with profile_queries() as profile:
+            client.get("/book/1")
+        profile.assert_budget(3)
+
+    Only statements on an engine passed to ``enable_query_profiling`` are seen.
+    """
+    profile = QueryProfile(label=label)
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+
+
+class QueryProfilingMiddleware:
+    """Binds a QueryProfile to every HTTP request and warns about N+1 patterns when it ends."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or current_profile.get() is not None:
+            # a surrounding profile_queries() block keeps collecting across requests
+            await self.app(scope, receive, send)
+            return
+
+        profile = QueryProfile(scope)
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_profile.reset(token)
+            for shape, count in profile.repeated().items():
+                logger.warning("possible N+1 on %s %s: %d x %s", scope["method"], profile.route, count, shape)
+            logger.debug(
+                "%s %s ran %d queries in %.1f ms",
+                scope["method"], profile.route, profile.count, profile.duration * 1000,
+            )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._profiling_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - context._profiling_started
+    profile = current_profile.get()
+    if profile is not None:
+        profile.queries.append(QueryRecord(statement, parameters, duration))
+    if duration * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            "slow query on %s (%.1f ms): %s %r",
+            profile.route if profile is not None else "none", duration * 1000, statement, parameters,
+        )
+
+
+def enable_query_profiling(engine: AsyncEngine) -> None:
+    if event.contains(engine.sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,83 @@
+import time
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+
+from src.cache import TTLCache
+from src.config import settings
+
+
+# set on responses to writes; while it has not expired the client reads from the primary
+STICKY_COOKIE = "read_primary_until"
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+# bearer tokens that wrote recently, for API clients that do not keep cookies; private to each worker
+recent_writers = TTLCache(maxsize=10000, ttl=settings.REPLICA_STICKY_SECONDS)
+
+
+def bearer_token(headers: Headers) -> Optional[str]:
+    # the token is only ever compared, never decoded: a write that fails authentication is not pinned
+    authorization = headers.get("Authorization")
+    return authorization.replace("Bearer ", "") if authorization else None
+
+
+def prefers_primary(request: Request) -> bool:
+    """Whether this client wrote recently enough that the replica may not have its change yet."""
+    try:
+        if float(request.cookies[STICKY_COOKIE]) > time.time():
+            return True
+    except (KeyError, ValueError):
+        pass
+    token = bearer_token(request.headers)
+    return token is not None and token in recent_writers
+
+
+class ReplicaHealth:
+    """Remembers a failed replica connection so requests skip it instead of waiting on it again."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        self.down_until = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def mark_down(self) -> None:
+        self.down_until = time.monotonic() + self.retry_after
+
+
+replica_health = ReplicaHealth(settings.REPLICA_RETRY_SECONDS)
+
+
+class ReadYourWritesMiddleware:
+    """Pins a client to the primary for REPLICA_STICKY_SECONDS after each successful write.
+
+    Browsers are pinned by a cookie; the bearer token is pinned too, for clients that drop it.
+    """
+
+    def __init__(self, app, sticky_seconds: float = settings.REPLICA_STICKY_SECONDS):
+        self.app = app
+        self.sticky_seconds = sticky_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        token = bearer_token(Headers(scope=scope))
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                if token is not None:
+                    recent_writers.set(token, True, ttl=self.sticky_seconds)
+                until = time.time() + self.sticky_seconds
+                cookie = (
+                    f"{STICKY_COOKIE}={until:.3f}; Max-Age={int(self.sticky_seconds) + 1}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -14,3 +14,23 @@ class SubscriptionModel(BaseEnum):
     FREE = 'free'
     PLUS = 'plus'
     PREMIUM = 'premium'
+
+class BookSortField(BaseEnum):
+    PRICE = 'price'
+    CREATED_AT = 'created_at'
+    RELEVANCE = 'relevance'
+
+class SortOrder(BaseEnum):
+    ASC = 'asc'
+    DESC = 'desc'
+
+class DataFormat(BaseEnum):
+    CSV = 'csv'
+    NDJSON = 'ndjson'
+
+class WalletTransactionKind(BaseEnum):
+    CREDIT = 'credit'
+    DEBIT = 'debit'
+    ADJUSTMENT = 'adjustment'
+    RESERVATION = 'reservation'
+    REFUND = 'refund'
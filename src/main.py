@@ -1,19 +1,65 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from starlette.status import HTTP_503_SERVICE_UNAVAILABLE
+
+from src.auth.hashing import password_hasher
+from src.config import settings
+from src.database.core import engine, replica_engine
+from src.database.profiling import QueryProfilingMiddleware, enable_query_profiling
+from src.database.replica import ReadYourWritesMiddleware
+from src.metrics.middleware import MetricsMiddleware, instrument_engine
+from src.metrics.views import metrics_router
 from src.auth.views import user_router, auth_router
 from src.profile.views import profile_route
 from src.book.view import book_router
 from src.reserve.view import reserve_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    password_hasher.shutdown()
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+
 app = FastAPI(
     title="FastAPI JWT Authentication",
     description="A simple FastAPI app with JWT authentication",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 
 
+engines = [engine] if replica_engine is None else [engine, replica_engine]
+for app_engine in engines:
+    instrument_engine(app_engine)
+    if settings.QUERY_PROFILING:
+        enable_query_profiling(app_engine)
+
+if replica_engine is not None:
+    app.add_middleware(ReadYourWritesMiddleware)
+app.add_middleware(MetricsMiddleware)
+if settings.QUERY_PROFILING:
+    app.add_middleware(QueryProfilingMiddleware)
+
 app.include_router(auth_router)
 app.include_router(user_router)
 app.include_router(profile_route)
 app.include_router(book_router)
 app.include_router(reserve_router)
+app.include_router(metrics_router)
+
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    return JSONResponse(
+        status_code=HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database is busy, try again later"},
+        headers={"Retry-After": "1"},
+    )
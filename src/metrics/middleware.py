@@ -0,0 +1,107 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .registry import registry
+
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+http_requests = registry.counter(
+    "http_requests_total", "Handled HTTP requests", labels=("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency", labels=("method", "route")
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"
+)
+http_request_db_queries = registry.histogram(
+    "http_request_db_queries", "Database statements issued per HTTP request",
+    labels=("method", "route"), buckets=QUERY_COUNT_BUCKETS,
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Database statement latency", labels=("route",)
+)
+
+
+class RequestStats:
+    __slots__ = ("scope", "queries", "query_seconds")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.queries = 0
+        self.query_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        # routing fills the scope in after the middleware ran, so resolve it lazily
+        return route_of(self.scope)
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def route_of(scope: dict) -> str:
+    # the template, not the raw path, so ids do not explode the label cardinality
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route counts, latency and database usage."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            current_request.reset(token)
+            method, route = scope["method"], stats.route
+            http_requests.inc(method=method, route=route, status=status)
+            http_request_duration.observe(elapsed, method=method, route=route)
+            http_request_db_queries.observe(stats.queries, method=method, route=route)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    stats = current_request.get()
+    if stats is None:
+        db_query_duration.observe(elapsed, route="none")
+        return
+    stats.queries += 1
+    stats.query_seconds += elapsed
+    db_query_duration.observe(elapsed, route=stats.route)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Times every statement the engine runs and attributes it to the current request."""
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,150 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+
+    def key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    @abstractmethod
+    def samples(self) -> Iterable[str]:
+        pass
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self.key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.values.items():
+            yield f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        self.values[self.key(labels)] = value
+
+
+class CallbackGauge(Metric):
+    """Gauge whose samples are read from a callback when the registry is rendered."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, callback: Callable[[], Dict[Tuple[str, ...], float]], labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self.callback = callback
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.callback().items():
+            yield f"{self.name}{format_labels(self.label_names, key)} {format_value(value)}"
+
+
+class CallbackCounter(CallbackGauge):
+    """Counter kept elsewhere, e.g. by a cache, and read when the registry is rendered."""
+
+    kind = "counter"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self.key(labels)
+        state = self.values.get(key)
+        if state is None:
+            # per bucket counts, then sum and count
+            state = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[index] += 1
+                break
+        state[-2] += value
+        state[-1] += 1
+
+    def samples(self) -> Iterable[str]:
+        for key, state in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = format_labels(self.label_names, key, f'le="{format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.label_names, key)
+            yield f"{self.name}_sum{labels} {format_value(state[-2])}"
+            yield f"{self.name}_count{labels} {state[-1]}"
+
+
+class Registry:
+    """Holds the process metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, description, labels))
+
+    def gauge(self, name: str, description: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, description, labels))
+
+    def histogram(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, description, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
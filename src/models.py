@@ -1,6 +1,6 @@
 from src.database.core import Base
 
 from src.auth.models import User
-from src.profile.models import Customer, Author, City
+from src.profile.models import Customer, Author, City, WalletSnapshot, WalletTransaction
 from src.book.models import Book, Gener, BookAuthor
 from src.reserve.models import Reserve
@@ -0,0 +1,57 @@
+import base64
+import binascii
+import json
+from typing import Any, Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import Row, Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from starlette.status import HTTP_400_BAD_REQUEST
+
+
+T = TypeVar("T")
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encodes the keyset position of the last row of a page into an opaque token."""
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> list:
+    """Decodes a token made by `encode_cursor`, coercing each value with the given types."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("cursor shape mismatch")
+        return [value if value is None else cast(value) for cast, value in zip(types, values)]
+    except (ValueError, TypeError, binascii.Error, UnicodeEncodeError):
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+async def paginate_by_key(
+    db_session: AsyncSession, stmt: Select, key: InstrumentedAttribute, limit: int, cursor: Optional[str] = None
+) -> Tuple[Sequence[Row], Optional[str]]:
+    """Keyset pagination of `stmt` on a unique integer column, ascending.
+
+    `key` must be one of the selected columns; one extra row tells whether a next page exists.
+    """
+    stmt = stmt.order_by(key).limit(limit + 1)
+    if cursor:
+        (last_key,) = decode_cursor(cursor, int)
+        stmt = stmt.where(key > last_key)
+
+    rows = (await db_session.execute(stmt)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], key.key))
+    return rows, next_cursor
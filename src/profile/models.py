@@ -1,10 +1,11 @@
 from typing import Optional
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Enum
+from pydantic import Field
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Enum
 from datetime import datetime
 
 from sqlalchemy.orm import relationship
 from src.schemas import BookTankBase
-from src.enums import SubscriptionModel
+from src.enums import SubscriptionModel, WalletTransactionKind
 from src.auth.models import UserCreate, UserRead
 from src.database.core import Base
 from src.base import PrimaryKeyMixin
@@ -17,6 +18,38 @@ class Customer(Base):
     subscription_end = Column(DateTime, nullable = True)
     wallet_money = Column(Integer, default=0, nullable=False)
 
+    # admin listings filter on these and page by the primary key
+    __table_args__ = (
+        Index("ix_customer_subscription_model_user", "subscription_model", "user"),
+        Index("ix_customer_subscription_end_user", "subscription_end", "user"),
+        Index("ix_customer_wallet_money_user", "wallet_money", "user"),
+    )
+
+class WalletTransaction(Base, PrimaryKeyMixin):
+    """Append-only ledger of every change to `Customer.wallet_money`, written in the same transaction."""
+    customer_id = Column(Integer, ForeignKey('customer.user', ondelete='CASCADE'), nullable=False)
+    # signed, credits are positive
+    amount = Column(Integer, nullable=False)
+    kind = Column(Enum(WalletTransactionKind), nullable=False)
+    reserve_id = Column(Integer, ForeignKey('reserve.id', ondelete='SET NULL'), nullable=True)
+    note = Column(String(255), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_wallet_transaction_customer_id_id", "customer_id", "id"),
+    )
+
+class WalletSnapshot(Base, PrimaryKeyMixin):
+    """A customer's balance including every ledger row up to `transaction_id`."""
+    customer_id = Column(Integer, ForeignKey('customer.user', ondelete='CASCADE'), nullable=False)
+    transaction_id = Column(Integer, nullable=False)
+    balance = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_wallet_snapshot_customer_id_created_at", "customer_id", "created_at"),
+    )
+
 class City(Base, PrimaryKeyMixin):
     name = Column(String, nullable=False)
 
@@ -57,8 +90,36 @@ class CustomerUpdateResponse(BookTankBase):
     subscription_end: Optional[datetime]
     wallet_money: int
 
+class CustomerFilter(BookTankBase):
+    subscription_model: Optional[SubscriptionModel] = None
+    subscription_end_after: Optional[datetime] = None
+    subscription_end_before: Optional[datetime] = None
+    min_wallet: Optional[int] = None
+    max_wallet: Optional[int] = None
+
 class CustomerUpdate(BookTankBase):
     subscription_model: Optional[SubscriptionModel] = None
     subscription_end: Optional[datetime] = None
-    wallet_money: Optional[int] = None
+    wallet_money: Optional[int] = Field(None, ge=0)
+
+class WalletChange(BookTankBase):
+    amount: int = Field(..., gt=0)
+    note: Optional[str] = Field(None, max_length=255)
+
+class WalletTransactionRead(BookTankBase):
+    id: int
+    customer_id: int
+    amount: int
+    kind: WalletTransactionKind
+    reserve_id: Optional[int] = None
+    note: Optional[str] = None
+    created_at: datetime
+
+class WalletTransactionResult(WalletTransactionRead):
+    # the balance right after this transaction
+    balance: int
 
+class WalletBalance(BookTankBase):
+    customer_id: int
+    balance: int
+    at: Optional[datetime] = None
@@ -1,7 +1,8 @@
 
 from datetime import UTC
+from typing import Optional, Sequence, Tuple
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import Row, Select, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.sql import delete
 from sqlalchemy.sql.functions import user
@@ -9,11 +10,18 @@ from starlette.status import HTTP_404_NOT_FOUND
 from src.reserve.models import Reserve
 from src.enums import SubscriptionModel, UserRoles
 from src.database.core import DbSession
+from src.database.lookups import row_exists
 from src.auth.service import create_user
-from .models import City, Customer, CustomerRegister, CustomerUpdate, AuthorRegister, Author
+from src.pagination import paginate_by_key
+from .models import City, Customer, CustomerFilter, CustomerRegister, CustomerUpdate, AuthorRegister, Author
+from .wallet import WalletService
 
 
 class CityService:
+    @staticmethod
+    async def exists(*, city_id: int, db_session: DbSession) -> bool:
+        return await row_exists(db_session, City.id == city_id)
+
     @staticmethod
     async def get_city(*, city_id: int, db_session: DbSession) -> City | None:
         city = await db_session.get(City, city_id)
@@ -25,7 +33,7 @@ class CityService:
 class AuthorService:
     @staticmethod
     async def create(*, author: AuthorRegister, db_session: DbSession) -> Author:
-        if await CityService.get_city(city_id=author.city, db_session=db_session) is None:
+        if not await CityService.exists(city_id=author.city, db_session=db_session):
             raise HTTPException(HTTP_404_NOT_FOUND, detail=f"The city with id {author.city} not found!")
 
         user = await create_user(user=author.user, db_session=db_session, role=UserRoles.AUTHOR)
@@ -36,6 +44,10 @@ class AuthorService:
         return author_db
 
 
+# the columns of a CustomerGet, read without building identity-mapped entities
+CUSTOMER_COLUMNS = (Customer.user, Customer.subscription_model, Customer.subscription_end, Customer.wallet_money)
+
+
 class CustomerService:
     @staticmethod
     async def create(*, customer: CustomerRegister, db_session: DbSession) -> Customer:
@@ -47,38 +59,74 @@ class CustomerService:
         return customer_db
 
     @staticmethod
-    async def update(*, user_id: int, customer_update: CustomerUpdate, db_session: DbSession) -> Customer:
-        customer = await db_session.get(Customer, user_id)
-        if not customer:
-            raise HTTPException(status_code=404, detail="Customer not found")
-
+    async def update(*, user_id: int, customer_update: CustomerUpdate, db_session: DbSession) -> Row:
         update_data = customer_update.dict(exclude_unset=True)
-
-        for key, value in update_data.items():
-            setattr(customer, key, value)
-
-        await db_session.commit()
-        await db_session.refresh(customer)
-
+        wallet_money = update_data.pop("wallet_money", None)
+        # single statements instead of read-modify-write, so concurrent wallet changes are kept
+        try:
+            if wallet_money is not None:
+                await WalletService.set_balance(db_session, user_id, wallet_money, note="set by admin")
+            columns = (Customer.subscription_model, Customer.subscription_end, Customer.wallet_money)
+            if update_data:
+                stmt = update(Customer).where(Customer.user == user_id).values(**update_data).returning(*columns)
+            else:
+                stmt = select(*columns).where(Customer.user == user_id)
+            result = await db_session.execute(stmt)
+            customer = result.first()
+            if customer is None:
+                raise HTTPException(status_code=404, detail="Customer not found")
+            await db_session.commit()
+        except Exception:
+            await db_session.rollback()
+            raise
         return customer
     
+    @staticmethod
+    async def exists(*, user_id: int, db_session: DbSession) -> bool:
+        return await row_exists(db_session, Customer.user == user_id)
+
     @staticmethod
     async def get_customer(*, user_id: int, db_session: DbSession) -> Customer:
         customer = await db_session.get(Customer, user_id)
         if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
         return customer
-    
-    
+
+    @staticmethod
+    async def get_customer_row(*, user_id: int, db_session: DbSession) -> Row:
+        result = await db_session.execute(select(*CUSTOMER_COLUMNS).where(Customer.user == user_id))
+        customer = result.first()
+        if not customer:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        return customer
+
+    @staticmethod
+    def customer_rows_query(filters: CustomerFilter) -> Select:
+        stmt = select(*CUSTOMER_COLUMNS)
+        if filters.subscription_model is not None:
+            stmt = stmt.where(Customer.subscription_model == filters.subscription_model)
+        if filters.subscription_end_after is not None:
+            stmt = stmt.where(Customer.subscription_end >= filters.subscription_end_after)
+        if filters.subscription_end_before is not None:
+            stmt = stmt.where(Customer.subscription_end < filters.subscription_end_before)
+        if filters.min_wallet is not None:
+            stmt = stmt.where(Customer.wallet_money >= filters.min_wallet)
+        if filters.max_wallet is not None:
+            stmt = stmt.where(Customer.wallet_money <= filters.max_wallet)
+        return stmt
+
+    @staticmethod
+    async def get_customer_rows_page(
+        *, db_session: DbSession, filters: CustomerFilter, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[Sequence[Row], Optional[str]]:
+        stmt = CustomerService.customer_rows_query(filters)
+        return await paginate_by_key(db_session, stmt, Customer.user, limit, cursor)
 
     @staticmethod
     async def delete_customer(db_session: DbSession, user_id: int):
         try:
-            # Check if the customer has any reservations
-            result = await db_session.execute(select(Reserve).where(Reserve.customer_id == user_id))
-            reservations = result.scalars().all()
-
-            if reservations:
+            # an index-only EXISTS probe instead of loading every reservation
+            if await row_exists(db_session, Reserve.customer_id == user_id):
                 raise HTTPException(status_code=400, detail="Cannot delete customer with active reservations.")
 
             customer = await db_session.get(Customer, user_id)
@@ -1,24 +1,44 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.sql import select
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request
 
 from src.auth import dependencies
 from src.auth.dependencies import admin_permission, current_user_or_admin
 from src.auth.permissions import AdminPermission
-from src.database.core import DbSession
-from .models import AuthorRead, AuthorRegister, CustomerGet, CustomerRead, CustomerRegister, CustomerUpdate, Customer, CustomerUpdateResponse
+from src.config import settings
+from src.database.core import DbSession, ReadDbSession, read_sessionmaker
+from src.enums import DataFormat
+from src.pagination import Page
+from src.responses import FastJSONResponse, JSONSerializer, export_response, export_rows
+from .models import (
+    AuthorRead, AuthorRegister, CustomerFilter, CustomerGet, CustomerRead, CustomerRegister, CustomerUpdate, Customer,
+    CustomerUpdateResponse, WalletBalance, WalletChange, WalletTransactionRead, WalletTransactionResult,
+)
 from .service import AuthorService, CustomerService
+from .wallet import WalletService
 
 
-profile_route = APIRouter(prefix="/profile", tags=["profile"])
+profile_route = APIRouter(prefix="/profile", tags=["profile"], default_response_class=FastJSONResponse)
+customer_page_serializer = JSONSerializer(Page[CustomerGet])
+wallet_page_serializer = JSONSerializer(Page[WalletTransactionRead])
 
 
-@profile_route.get("/customers", response_model=List[CustomerGet], dependencies=[Depends(admin_permission)])
-async def get_all_customers(db: DbSession):
-    # Asynchronous query
-    result = await db.execute(select(Customer))
-    customers = result.scalars().all()
-    return customers
+@profile_route.get("/customers", response_model=Page[CustomerGet], dependencies=[Depends(admin_permission)])
+async def get_all_customers(
+    request: Request,
+    db: ReadDbSession,
+    filters: CustomerFilter = Depends(),
+    limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    export: Optional[DataFormat] = None,
+):
+    if export:
+        stmt = CustomerService.customer_rows_query(filters).order_by(Customer.user)
+        return export_response(export_rows(read_sessionmaker(request), stmt, CustomerGet, export), export, "customers")
+    customers, next_cursor = await CustomerService.get_customer_rows_page(
+        db_session=db, filters=filters, limit=limit, cursor=cursor
+    )
+    return customer_page_serializer.response({"items": customers, "next_cursor": next_cursor})
 
 @profile_route.post('/customer', response_model=CustomerRead)
 async def create_customer_view(
@@ -34,15 +54,8 @@ async def create_customer_view(
     }
 
 @profile_route.get("/customer/{user_id}", response_model=CustomerGet, dependencies=[Depends(current_user_or_admin)])
-async def get_one_customer(user_id: int, db: DbSession):
-    # Asynchronous query to get a single customer
-    result = await db.execute(select(Customer).filter(Customer.user == user_id))
-    customer = result.scalars().first()
-
-    if not customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
-    
-    return customer
+async def get_one_customer(user_id: int, db: ReadDbSession):
+    return await CustomerService.get_customer_row(user_id=user_id, db_session=db)
 
 
 
@@ -52,18 +65,7 @@ async def update_customer_view(
     customer_update: CustomerUpdate,
     db_session: DbSession,
 ):
-    customer = await db_session.get(Customer, user_id)
-    if not customer:
-        raise HTTPException(status_code=404, detail="Customer not found")
-
-    update_data = customer_update.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(customer, key, value)
-
-    await db_session.commit()
-    await db_session.refresh(customer)
-
-    return customer
+    return await CustomerService.update(user_id=user_id, customer_update=customer_update, db_session=db_session)
 
 
 @profile_route.delete("/customer/{user_id}", status_code=204 , dependencies=[Depends(admin_permission)])
@@ -75,6 +77,50 @@ async def delete_customer_view(
     return None
 
 
+@profile_route.get(
+    "/customer/{user_id}/wallet", response_model=WalletBalance, dependencies=[Depends(current_user_or_admin)]
+)
+async def get_wallet_balance(user_id: int, db: ReadDbSession, at: Optional[datetime] = None):
+    at = at.replace(tzinfo=None) if at and at.tzinfo else at
+    balance = await WalletService.get_balance(db, user_id, at)
+    return {"customer_id": user_id, "balance": balance, "at": at}
+
+@profile_route.get(
+    "/customer/{user_id}/wallet/transactions",
+    response_model=Page[WalletTransactionRead],
+    dependencies=[Depends(current_user_or_admin)],
+)
+async def get_wallet_transactions(
+    user_id: int,
+    db: ReadDbSession,
+    limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    transactions, next_cursor = await WalletService.get_transactions_page(db, user_id, limit, cursor)
+    return wallet_page_serializer.response({"items": transactions, "next_cursor": next_cursor})
+
+async def _change_wallet(db_session: DbSession, change, user_id: int, wallet_change: WalletChange):
+    try:
+        transaction, balance = await change(db_session, user_id, wallet_change.amount, note=wallet_change.note)
+        await db_session.commit()
+    except Exception:
+        await db_session.rollback()
+        raise
+    return {**transaction._mapping, "balance": balance}
+
+@profile_route.post(
+    "/customer/{user_id}/wallet/credit", response_model=WalletTransactionResult, dependencies=[Depends(admin_permission)]
+)
+async def credit_wallet(user_id: int, wallet_change: WalletChange, db_session: DbSession):
+    return await _change_wallet(db_session, WalletService.credit, user_id, wallet_change)
+
+@profile_route.post(
+    "/customer/{user_id}/wallet/debit", response_model=WalletTransactionResult, dependencies=[Depends(admin_permission)]
+)
+async def debit_wallet(user_id: int, wallet_change: WalletChange, db_session: DbSession):
+    return await _change_wallet(db_session, WalletService.debit, user_id, wallet_change)
+
+
 @profile_route.post('/author', response_model=AuthorRead)
 async def create_author_view(author: AuthorRegister, db_session: DbSession):
     new_author = await AuthorService.create(author=author, db_session=db_session)
@@ -0,0 +1,235 @@
+"""Customer wallet ledger.
+
+`Customer.wallet_money` is the balance and is only ever changed by a single
+`UPDATE ... RETURNING` that applies a delta and refuses to go below zero, so
+concurrent top-ups and charges never lose each other's update. Every change
+appends a `WalletTransaction` row in the same database transaction; nothing
+here commits, callers do, so a charge can share a transaction with the
+reservation it pays for.
+
+Balances are snapshotted periodically, so the balance at a past moment is the
+latest snapshot before it plus the few ledger rows written since. Run from
+cron or a scheduler with::
+
+    python -m src.profile.wallet snapshot
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Row, func, insert, literal, literal_column, select, update
+
+from src.database.core import AsyncSessionLocal, DbSession
+from src.database.lookups import row_exists
+from src.enums import WalletTransactionKind
+from src.pagination import decode_cursor, encode_cursor
+from .models import Customer, WalletSnapshot, WalletTransaction
+
+
+# the columns of a WalletTransactionRead
+WALLET_TRANSACTION_COLUMNS = (
+    WalletTransaction.id, WalletTransaction.customer_id, WalletTransaction.amount, WalletTransaction.kind,
+    WalletTransaction.reserve_id, WalletTransaction.note, WalletTransaction.created_at,
+)
+
+
+class WalletService:
+    @staticmethod
+    async def apply(
+        db: DbSession,
+        customer_id: int,
+        amount: int,
+        kind: WalletTransactionKind,
+        *,
+        reserve_id: Optional[int] = None,
+        note: Optional[str] = None,
+    ) -> Tuple[Row, int]:
+        """Adds the signed `amount` to the balance and records it, returning the ledger row and new balance."""
+        balance = await db.scalar(
+            update(Customer)
+            .where(Customer.user == customer_id, Customer.wallet_money + amount >= 0)
+            .values(wallet_money=Customer.wallet_money + amount)
+            .returning(Customer.wallet_money)
+        )
+        if balance is None:
+            if not await row_exists(db, Customer.user == customer_id):
+                raise HTTPException(status_code=404, detail="Customer not found")
+            raise HTTPException(status_code=400, detail="Insufficient wallet balance")
+
+        result = await db.execute(
+            insert(WalletTransaction)
+            .values(
+                customer_id=customer_id, amount=amount, kind=kind, reserve_id=reserve_id, note=note,
+                created_at=datetime.utcnow(),
+            )
+            .returning(*WALLET_TRANSACTION_COLUMNS)
+        )
+        return result.one(), balance
+
+    @staticmethod
+    async def apply_many(
+        db: DbSession, customer_id: int, kind: WalletTransactionKind, entries: Sequence[Tuple[int, Optional[int]]]
+    ) -> Tuple[Sequence[Row], int]:
+        """Applies several signed `(amount, reserve_id)` entries at once, all or nothing.
+
+        The balance moves by their sum in one UPDATE and every entry gets its own ledger row
+        from one multi-row INSERT, so each stays matched to the reservation it paid for.
+        """
+        total = sum(amount for amount, _ in entries)
+        balance = await db.scalar(
+            update(Customer)
+            .where(Customer.user == customer_id, Customer.wallet_money + total >= 0)
+            .values(wallet_money=Customer.wallet_money + total)
+            .returning(Customer.wallet_money)
+        )
+        if balance is None:
+            if not await row_exists(db, Customer.user == customer_id):
+                raise HTTPException(status_code=404, detail="Customer not found")
+            raise HTTPException(status_code=400, detail="Insufficient wallet balance")
+
+        now = datetime.utcnow()
+        result = await db.execute(
+            insert(WalletTransaction).returning(*WALLET_TRANSACTION_COLUMNS, sort_by_parameter_order=True),
+            [
+                dict(customer_id=customer_id, amount=amount, kind=kind, reserve_id=reserve_id, note=None, created_at=now)
+                for amount, reserve_id in entries
+            ],
+        )
+        return result.all(), balance
+
+    @staticmethod
+    async def credit(db: DbSession, customer_id: int, amount: int, kind=WalletTransactionKind.CREDIT, **kwargs):
+        return await WalletService.apply(db, customer_id, amount, kind, **kwargs)
+
+    @staticmethod
+    async def debit(db: DbSession, customer_id: int, amount: int, kind=WalletTransactionKind.DEBIT, **kwargs):
+        return await WalletService.apply(db, customer_id, -amount, kind, **kwargs)
+
+    @staticmethod
+    async def set_balance(db: DbSession, customer_id: int, balance: int, note: Optional[str] = None) -> Optional[Row]:
+        """Sets an absolute balance, recording the difference as an adjustment.
+
+        The old balance is read under a row lock by the same statement, so the recorded
+        difference is exact even while other transactions move the balance.
+        """
+        previous = (
+            select(Customer.user, Customer.wallet_money)
+            .where(Customer.user == customer_id)
+            .with_for_update()
+            .subquery()
+        )
+        old_balance = await db.scalar(
+            update(Customer)
+            .where(Customer.user == previous.c.user)
+            .values(wallet_money=balance)
+            .returning(previous.c.wallet_money)
+        )
+        if old_balance is None:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        if old_balance == balance:
+            return None
+
+        result = await db.execute(
+            insert(WalletTransaction)
+            .values(
+                customer_id=customer_id, amount=balance - old_balance, kind=WalletTransactionKind.ADJUSTMENT,
+                note=note, created_at=datetime.utcnow(),
+            )
+            .returning(*WALLET_TRANSACTION_COLUMNS)
+        )
+        return result.one()
+
+    @staticmethod
+    async def get_transactions_page(
+        db: DbSession, customer_id: int, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[Sequence[Row], Optional[str]]:
+        # newest first on the (customer_id, id) index
+        stmt = select(*WALLET_TRANSACTION_COLUMNS).where(WalletTransaction.customer_id == customer_id)
+        if cursor:
+            (last_id,) = decode_cursor(cursor, int)
+            stmt = stmt.where(WalletTransaction.id < last_id)
+
+        result = await db.execute(stmt.order_by(WalletTransaction.id.desc()).limit(limit + 1))
+        rows = result.all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].id)
+        return rows, next_cursor
+
+    @staticmethod
+    async def get_balance(db: DbSession, customer_id: int, at: Optional[datetime] = None) -> int:
+        """The current balance, or the one at `at` from the last snapshot before it plus the ledger since."""
+        if at is None:
+            balance = await db.scalar(select(Customer.wallet_money).where(Customer.user == customer_id))
+            if balance is None:
+                raise HTTPException(status_code=404, detail="Customer not found")
+            return balance
+
+        if not await row_exists(db, Customer.user == customer_id):
+            raise HTTPException(status_code=404, detail="Customer not found")
+        snapshot = (await db.execute(
+            select(WalletSnapshot.transaction_id, WalletSnapshot.balance)
+            .where(WalletSnapshot.customer_id == customer_id, WalletSnapshot.created_at <= at)
+            .order_by(WalletSnapshot.created_at.desc())
+            .limit(1)
+        )).first()
+        since_id, balance = snapshot if snapshot is not None else (0, 0)
+        delta = await db.scalar(
+            select(func.coalesce(func.sum(WalletTransaction.amount), 0))
+            .where(
+                WalletTransaction.customer_id == customer_id,
+                WalletTransaction.id > since_id,
+                WalletTransaction.created_at <= at,
+            )
+        )
+        return balance + delta
+
+    @staticmethod
+    async def snapshot_balances(db: DbSession) -> int:
+        """Snapshots every customer whose ledger moved since their last snapshot, returning how many.
+
+        Balance and last ledger id are read by one statement, so they always agree: a change
+        to a customer's balance and its ledger row commit together.
+        """
+        last_transaction = (
+            select(func.max(WalletTransaction.id))
+            .where(WalletTransaction.customer_id == Customer.user)
+            .scalar_subquery()
+        )
+        moved = (
+            select(Customer.user, last_transaction.label("transaction_id"), Customer.wallet_money)
+            .subquery()
+        )
+        result = await db.execute(
+            insert(WalletSnapshot).from_select(
+                ["customer_id", "transaction_id", "balance", "created_at"],
+                select(moved.c.user, moved.c.transaction_id, moved.c.wallet_money, literal(datetime.utcnow()))
+                .where(moved.c.transaction_id > func.coalesce(
+                    select(func.max(WalletSnapshot.transaction_id))
+                    .where(WalletSnapshot.customer_id == moved.c.user)
+                    .scalar_subquery(),
+                    literal_column("0"),
+                )),
+            )
+        )
+        await db.commit()
+        return result.rowcount
+
+
+async def _snapshot() -> int:
+    async with AsyncSessionLocal() as session:
+        return await WalletService.snapshot_balances(session)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Customer wallet maintenance")
+    parser.add_argument("command", choices=["snapshot"])
+    parser.parse_args()
+    print(f"snapshotted {asyncio.run(_snapshot())} wallets")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
-from pydantic import validator
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, null
+from typing import List, Optional
+from pydantic import Field, validator
+from sqlalchemy import Column, Computed, DateTime, ForeignKey, Index, Integer, null
+from sqlalchemy.dialects.postgresql import TSRANGE
+from sqlalchemy.orm import deferred
+from src.config import settings
 from src.database.core import Base
+from src.enums import SubscriptionModel
 from src.schemas import BookTankBase
 from src.base import PrimaryKeyMixin, TimeStampMixin
 from datetime import datetime
@@ -11,24 +16,97 @@ class Reserve(Base, PrimaryKeyMixin, TimeStampMixin):
     start = Column(DateTime, nullable=False)
     end = Column(DateTime, nullable=False)
     price = Column(Integer, nullable=False)
+    returned_at = Column(DateTime, nullable=True)
+    # the booked interval as a range so overlap lookups can use the GiST index;
+    # an end before the start collapses to an empty range instead of failing the insert
+    period = deferred(Column(
+        TSRANGE,
+        Computed("tsrange(start, greatest(start, \"end\"), '[)')", persisted=True),
+    ))
 
-class ReserveBase(BookTankBase):
-    customer_id: int
+    __table_args__ = (
+        Index("ix_reserve_customer_id_start", "customer_id", "start"),
+        Index("ix_reserve_book_id_start", "book_id", "start"),
+        # needs the btree_gist extension for the integer column
+        Index("ix_reserve_book_id_period", "book_id", "period", postgresql_using="gist"),
+    )
+
+class ReserveWindow(BookTankBase):
     book_id: int
     start: datetime
     end: datetime
-    price: int
 
     @validator("start", "end", pre=True)
     def parse_and_make_naive(cls, v):
         if isinstance(v, str):  # Convert string to datetime if necessary
             v = datetime.fromisoformat(v)
         return v.replace(tzinfo=None) if v.tzinfo else v
+
+class ReserveBase(ReserveWindow):
+    customer_id: int
+
 class ReserveCreate(ReserveBase):
-    pass
+    # priced server-side, a price sent by the client is ignored
+    price: Optional[int] = None
 
 class ReserveUpdate(ReserveBase):
-    pass
+    price: Optional[int] = None
 
 class ReserveResponse(ReserveBase):
     id: int
+    price: int
+    returned_at: Optional[datetime] = None
+
+class ReserveBatch(BookTankBase):
+    customer_id: int
+    items: List[ReserveWindow] = Field(..., min_length=1, max_length=settings.RESERVE_BATCH_MAX_ITEMS)
+
+class ReserveBatchItemResult(BookTankBase):
+    index: int
+    book_id: int
+    reserve: Optional[ReserveResponse] = None
+    error: Optional[str] = None
+
+class ReserveBatchResult(BookTankBase):
+    items: List[ReserveBatchItemResult]
+    total: int
+
+class QuoteItem(ReserveWindow):
+    pass
+
+class QuoteRequest(BookTankBase):
+    customer_id: int
+    items: List[QuoteItem] = Field(..., min_length=1, max_length=settings.QUOTE_MAX_ITEMS)
+
+class QuoteLine(QuoteItem):
+    days: int
+    # the weekly price of the book
+    book_price: int
+    discount_percent: int
+    price: int
+
+class Quote(BookTankBase):
+    customer_id: int
+    subscription_model: SubscriptionModel
+    items: List[QuoteLine]
+    total: int
+
+class ReserveFilter(BookTankBase):
+    start_after: Optional[datetime] = None
+    start_before: Optional[datetime] = None
+    returned: Optional[bool] = None
+
+    @validator("start_after", "start_before")
+    def make_naive(cls, v):
+        return v.replace(tzinfo=None) if v is not None and v.tzinfo else v
+
+class AvailabilityWindow(BookTankBase):
+    start: datetime
+    end: datetime
+    # copies free throughout the window
+    available: int
+
+class BookAvailability(BookTankBase):
+    book_id: int
+    copies: int
+    windows: List[AvailabilityWindow]
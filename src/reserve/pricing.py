@@ -0,0 +1,94 @@
+"""Server-side reservation pricing.
+
+`Book.price` is the price of keeping a copy for a week. A reservation costs
+that pro rata per started day, less the discount of the customer's
+subscription tier. A paid tier whose `subscription_end` has passed prices as
+FREE. Prices are whole units, rounded up before the discount and down after.
+"""
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from src.book.models import Book
+from src.database.core import DbSession
+from src.enums import SubscriptionModel
+from src.profile.models import Customer
+from .models import Quote, QuoteItem, QuoteLine
+
+
+DAYS_PER_PRICE_PERIOD = 7
+SECONDS_PER_DAY = 24 * 60 * 60
+TIER_DISCOUNT_PERCENT = {
+    SubscriptionModel.FREE: 0,
+    SubscriptionModel.PLUS: 10,
+    SubscriptionModel.PREMIUM: 25,
+}
+
+
+def effective_tier(model: SubscriptionModel, subscription_end: Optional[datetime], now: datetime) -> SubscriptionModel:
+    if subscription_end is not None and subscription_end <= now:
+        return SubscriptionModel.FREE
+    return model
+
+
+def reservation_days(start: datetime, end: datetime) -> int:
+    if end <= start:
+        raise HTTPException(status_code=400, detail="A reservation must end after it starts")
+    # any started day counts, even one shorter than a second
+    return max(1, math.ceil((end - start).total_seconds() / SECONDS_PER_DAY))
+
+
+def reservation_price(book_price: int, days: int, tier: SubscriptionModel) -> int:
+    base = -(-book_price * days // DAYS_PER_PRICE_PERIOD)
+    return base * (100 - TIER_DISCOUNT_PERCENT[tier]) // 100
+
+
+class PricingService:
+    @staticmethod
+    async def customer_tier(db: DbSession, customer_id: int) -> SubscriptionModel:
+        result = await db.execute(
+            select(Customer.subscription_model, Customer.subscription_end).where(Customer.user == customer_id)
+        )
+        customer = result.first()
+        if customer is None:
+            raise HTTPException(status_code=404, detail="Customer not found")
+        return effective_tier(customer.subscription_model, customer.subscription_end, datetime.utcnow())
+
+    @staticmethod
+    async def book_prices(db: DbSession, book_ids: Iterable[int]) -> Dict[int, int]:
+        """Prices of the given books in one query, failing on any unknown id."""
+        book_ids = set(book_ids)
+        result = await db.execute(select(Book.id, Book.price).where(Book.id.in_(book_ids)))
+        prices = dict(result.all())
+        missing = book_ids - prices.keys()
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Book not found: {sorted(missing)}")
+        return prices
+
+    @staticmethod
+    async def price(db: DbSession, customer_id: int, book_id: int, start: datetime, end: datetime) -> int:
+        tier = await PricingService.customer_tier(db, customer_id)
+        prices = await PricingService.book_prices(db, [book_id])
+        return reservation_price(prices[book_id], reservation_days(start, end), tier)
+
+    @staticmethod
+    async def quote(db: DbSession, customer_id: int, items: List[QuoteItem]) -> Quote:
+        # two queries whatever the size of the basket
+        tier = await PricingService.customer_tier(db, customer_id)
+        prices = await PricingService.book_prices(db, (item.book_id for item in items))
+
+        discount = TIER_DISCOUNT_PERCENT[tier]
+        lines = []
+        for item in items:
+            days = reservation_days(item.start, item.end)
+            lines.append(QuoteLine(
+                book_id=item.book_id, start=item.start, end=item.end, days=days,
+                book_price=prices[item.book_id], discount_percent=discount,
+                price=reservation_price(prices[item.book_id], days, tier),
+            ))
+        return Quote(
+            customer_id=customer_id, subscription_model=tier, items=lines, total=sum(line.price for line in lines)
+        )
@@ -1,26 +1,158 @@
-
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
 from fastapi import HTTPException
+from sqlalchemy import Row, delete, func, insert, select, tuple_, update
 from src.database.core import DbSession
-from src.profile.service import CustomerService
+from src.pagination import decode_cursor, encode_cursor
+from src.profile.wallet import WalletService
+from src.enums import WalletTransactionKind
+from src.book.cache import invalidate_books
+from src.book.models import Book
 from src.book.service import BookService
-from .models import ReserveCreate, Reserve, ReserveUpdate
+from .pricing import PricingService, reservation_days, reservation_price
+from .models import (
+    AvailabilityWindow, BookAvailability, ReserveBatch, ReserveBatchItemResult, ReserveBatchResult, ReserveCreate,
+    Reserve, ReserveFilter, ReserveResponse, ReserveUpdate,
+)
+
+
+# the columns of a ReserveResponse
+RESERVE_RESPONSE_COLUMNS = (
+    Reserve.id, Reserve.customer_id, Reserve.book_id, Reserve.start, Reserve.end, Reserve.price, Reserve.returned_at,
+)
+
+
+def free_windows(
+    copies: int, reserves: Sequence, start: datetime, end: datetime
+) -> List[AvailabilityWindow]:
+    """Sweeps the reservations overlapping [start, end) into the windows with a copy to spare.
+
+    A reservation returned early gives its copy back at `returned_at`. Adjacent windows with
+    the same number of free copies are merged.
+    """
+    changes: Dict[datetime, int] = defaultdict(int)
+    for reserve in reserves:
+        held_until = min(reserve.end, reserve.returned_at) if reserve.returned_at else reserve.end
+        lower, upper = max(reserve.start, start), min(held_until, end)
+        if lower < upper:
+            changes[lower] -= 1
+            changes[upper] += 1
+
+    windows: List[AvailabilityWindow] = []
+    available, cursor = copies, start
+    for moment in sorted(changes) + [end]:
+        if moment > cursor and available > 0:
+            last = windows[-1] if windows else None
+            if last is not None and last.end == cursor and last.available == available:
+                last.end = moment
+            else:
+                windows.append(AvailabilityWindow(start=cursor, end=moment, available=available))
+        if moment == end:
+            break
+        available += changes[moment]
+        cursor = moment
+    return windows
 
 
 class ReserveService:
     @staticmethod
     async def create_reserve(db: DbSession, reserve_data: ReserveCreate) -> Reserve:
-        if await CustomerService.get_customer(db_session=db, user_id=reserve_data.customer_id) is None:
-            raise HTTPException(status_code=404, detail="Customer not found")
+        tier = await PricingService.customer_tier(db, reserve_data.customer_id)
+        days = reservation_days(reserve_data.start, reserve_data.end)
 
-        if await BookService.get_book(db, reserve_data.book_id) is None:
-            raise HTTPException(status_code=404, detail="Book not found")
+        # Taking the copy, inserting the reservation and charging the wallet share one
+        # transaction, so concurrent reservers can never oversell a book nor leave stock behind
+        try:
+            book_price = await BookService.take_unit(db, reserve_data.book_id)
+            reserve = Reserve(
+                **reserve_data.dict(exclude={"price"}), price=reservation_price(book_price, days, tier)
+            )
+            db.add(reserve)
+            await db.flush()
+            await ReserveService.charge(db, reserve.customer_id, reserve.price, reserve.id)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        await invalidate_books(reserve.book_id)
+        return reserve
 
+    @staticmethod
+    async def create_reserves(db: DbSession, batch: ReserveBatch) -> ReserveBatchResult:
+        """Reserves every item of a cart in one transaction, or none of them.
 
-        reserve = Reserve(**reserve_data.dict())
-        db.add(reserve)
-        await db.commit()
-        await db.refresh(reserve)
-        return reserve
+        When any item cannot be reserved nothing is written and the 409 lists the error of each item.
+        """
+        tier = await PricingService.customer_tier(db, batch.customer_id)
+        counts = Counter(item.book_id for item in batch.items)
+
+        try:
+            books = await BookService.lock_books(db, counts)
+            results, rows = [], []
+            now = datetime.utcnow()
+            for index, item in enumerate(batch.items):
+                result = ReserveBatchItemResult(index=index, book_id=item.book_id)
+                results.append(result)
+                book = books.get(item.book_id)
+                if book is None:
+                    result.error = "Book not found"
+                elif book.unit < counts[item.book_id]:
+                    result.error = "Book is out of stock"
+                elif item.end <= item.start:
+                    result.error = "A reservation must end after it starts"
+                else:
+                    days = reservation_days(item.start, item.end)
+                    rows.append(dict(
+                        customer_id=batch.customer_id, book_id=item.book_id, start=item.start, end=item.end,
+                        price=reservation_price(book.price, days, tier), created_at=now, updated_at=now,
+                    ))
+            if len(rows) < len(results):
+                raise HTTPException(
+                    status_code=409,
+                    detail=[result.model_dump(exclude_none=True) for result in results if result.error],
+                )
+
+            await BookService.take_units(db, counts)
+            # insertmanyvalues sends one multi-row INSERT and keeps RETURNING in parameter order
+            inserted = (await db.execute(
+                insert(Reserve).returning(*RESERVE_RESPONSE_COLUMNS, sort_by_parameter_order=True), rows
+            )).all()
+            total = sum(row.price for row in inserted)
+            # one debit for the cart, one ledger row per reservation for the refunds to match
+            charges = [(-row.price, row.id) for row in inserted if row.price]
+            if charges:
+                await WalletService.apply_many(db, batch.customer_id, WalletTransactionKind.RESERVATION, charges)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        await invalidate_books(*counts)
+
+        for result, row in zip(results, inserted):
+            result.reserve = ReserveResponse.model_validate(row, from_attributes=True)
+        return ReserveBatchResult(items=results, total=total)
+
+    @staticmethod
+    async def charge(db: DbSession, customer_id: int, price: int, reserve_id: int) -> None:
+        if price:
+            await WalletService.debit(
+                db, customer_id, price, kind=WalletTransactionKind.RESERVATION, reserve_id=reserve_id
+            )
+
+    @staticmethod
+    async def refund(db: DbSession, customer_id: int, price: int, reserve_id: Optional[int], note: str) -> None:
+        if price:
+            await WalletService.credit(
+                db, customer_id, price, kind=WalletTransactionKind.REFUND, reserve_id=reserve_id, note=note
+            )
+
+    @staticmethod
+    async def get_owner(db: DbSession, reserve_id: int) -> int:
+        customer_id = await db.scalar(select(Reserve.customer_id).where(Reserve.id == reserve_id))
+        if customer_id is None:
+            raise HTTPException(status_code=404, detail="Reserve not found")
+        return customer_id
 
     @staticmethod
     async def get_reserve(db: DbSession, reserve_id: int) -> Reserve:
@@ -29,25 +161,148 @@ class ReserveService:
             raise HTTPException(status_code=404, detail="Reserve not found")
         return reserve
 
+    @staticmethod
+    async def get_customer_reserves_page(
+        db: DbSession, customer_id: int, filters: ReserveFilter, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[Sequence[Row], Optional[str]]:
+        # newest first, keyset on (start, id) walking the (customer_id, start) index backwards
+        stmt = select(*RESERVE_RESPONSE_COLUMNS).where(Reserve.customer_id == customer_id)
+        if filters.start_after is not None:
+            stmt = stmt.where(Reserve.start >= filters.start_after)
+        if filters.start_before is not None:
+            stmt = stmt.where(Reserve.start < filters.start_before)
+        if filters.returned is not None:
+            stmt = stmt.where(Reserve.returned_at.isnot(None) if filters.returned else Reserve.returned_at.is_(None))
+        if cursor:
+            last_start, last_id = decode_cursor(cursor, datetime.fromisoformat, int)
+            stmt = stmt.where(tuple_(Reserve.start, Reserve.id) < tuple_(last_start, last_id))
+
+        result = await db.execute(stmt.order_by(Reserve.start.desc(), Reserve.id.desc()).limit(limit + 1))
+        rows = result.all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].start, rows[-1].id)
+        return rows, next_cursor
+
+    @staticmethod
+    async def get_availability(
+        db: DbSession, book_ids: List[int], start: datetime, end: datetime
+    ) -> List[BookAvailability]:
+        # copies a book owns are the ones on the shelf plus the ones out on open reservations
+        open_reserves = (
+            select(Reserve.book_id, func.count().label("held"))
+            .where(Reserve.book_id.in_(book_ids), Reserve.returned_at.is_(None))
+            .group_by(Reserve.book_id)
+            .subquery()
+        )
+        copies = dict((await db.execute(
+            select(Book.id, Book.unit + func.coalesce(open_reserves.c.held, 0))
+            .outerjoin(open_reserves, open_reserves.c.book_id == Book.id)
+            .where(Book.id.in_(book_ids))
+        )).all())
+        missing = set(book_ids) - copies.keys()
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Book not found: {sorted(missing)}")
+
+        # one range overlap lookup on the (book_id, period) GiST index for every book
+        result = await db.execute(
+            select(Reserve.book_id, Reserve.start, Reserve.end, Reserve.returned_at)
+            .where(
+                Reserve.book_id.in_(book_ids),
+                Reserve.period.overlaps(func.tsrange(start, end, "[)")),
+            )
+        )
+        reserves = defaultdict(list)
+        for row in result:
+            reserves[row.book_id].append(row)
+
+        return [
+            BookAvailability(
+                book_id=book_id,
+                copies=copies[book_id],
+                windows=free_windows(copies[book_id], reserves[book_id], start, end),
+            )
+            for book_id in dict.fromkeys(book_ids)
+        ]
+
     @staticmethod
     async def update_reserve(db: DbSession, reserve_id: int, reserve_data: ReserveUpdate) -> Reserve:
-        reserve = await db.get(Reserve, reserve_id)
-        if reserve:
-            if reserve_data.customer_id is not None and await CustomerService.get_customer(db_session=db, user_id=reserve_data.customer_id) is None:
-                raise HTTPException(status_code=404, detail="Customer not found")
+        try:
+            reserve = await db.get(Reserve, reserve_id, with_for_update=True)
+            if not reserve:
+                raise HTTPException(status_code=404, detail="Reserve not found")
+
+            # repricing also checks that the customer and the book exist
+            price = await PricingService.price(
+                db, reserve_data.customer_id, reserve_data.book_id, reserve_data.start, reserve_data.end
+            )
 
-            if reserve_data.book_id is not None and await BookService.get_book(db, reserve_data.book_id) is None:
-                raise HTTPException(status_code=404, detail="Book not found")
+            # moving an open reservation to another book moves the copy it holds
+            moved_books = []
+            if reserve_data.book_id != reserve.book_id and reserve.returned_at is None:
+                await BookService.take_unit(db, reserve_data.book_id)
+                await BookService.release_unit(db, reserve.book_id)
+                moved_books = [reserve.book_id, reserve_data.book_id]
 
-            for key, value in reserve_data.dict().items():
+            # a new price or customer gives the old charge back before taking the new one
+            if (reserve_data.customer_id, price) != (reserve.customer_id, reserve.price):
+                await ReserveService.refund(
+                    db, reserve.customer_id, reserve.price, reserve.id, note=f"reservation {reserve.id} changed"
+                )
+                await ReserveService.charge(db, reserve_data.customer_id, price, reserve.id)
+
+            for key, value in reserve_data.dict(exclude={"price"}).items():
                 setattr(reserve, key, value)
+            reserve.price = price
             await db.commit()
-            await db.refresh(reserve)
+        except Exception:
+            await db.rollback()
+            raise
+        if moved_books:
+            await invalidate_books(*moved_books)
         return reserve
 
+    @staticmethod
+    async def return_reserve(db: DbSession, reserve_id: int) -> Reserve:
+        try:
+            result = await db.execute(
+                update(Reserve)
+                .where(Reserve.id == reserve_id, Reserve.returned_at.is_(None))
+                .values(returned_at=datetime.utcnow())
+                .returning(Reserve.book_id)
+            )
+            book_id = result.scalar_one_or_none()
+            if book_id is None:
+                await ReserveService.get_reserve(db, reserve_id)
+                raise HTTPException(status_code=409, detail="Reserve already returned")
+
+            await BookService.release_unit(db, book_id)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        await invalidate_books(book_id)
+        return await ReserveService.get_reserve(db, reserve_id)
+
     @staticmethod
     async def delete_reserve(db: DbSession, reserve_id: int) -> None:
-        reserve = await db.get(Reserve, reserve_id)
-        if reserve:
-            await db.delete(reserve)
+        # cancelling a reservation that still holds a copy puts it back in stock and refunds it
+        try:
+            result = await db.execute(
+                delete(Reserve)
+                .where(Reserve.id == reserve_id)
+                .returning(Reserve.book_id, Reserve.customer_id, Reserve.price, Reserve.returned_at)
+            )
+            row = result.one_or_none()
+            if row is not None and row.returned_at is None:
+                await BookService.release_unit(db, row.book_id)
+                await ReserveService.refund(
+                    db, row.customer_id, row.price, None, note=f"reservation {reserve_id} cancelled"
+                )
             await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        if row is not None and row.returned_at is None:
+            await invalidate_books(row.book_id)
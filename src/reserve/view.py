@@ -1,23 +1,85 @@
-from fastapi import APIRouter 
-from src.database.core import DbSession
-from .models import ReserveCreate, ReserveUpdate, ReserveResponse
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from src.auth.dependencies import current_user_or_admin
+from src.auth.permissions import CustomerOrAdminPermission
+from src.auth.service import CurrentUser
+from src.config import settings
+from src.database.core import DbSession, ReadDbSession
+from src.pagination import Page
+from src.responses import JSONSerializer
+from .models import (
+    BookAvailability, Quote, QuoteRequest, ReserveBatch, ReserveBatchResult, ReserveCreate, ReserveFilter,
+    ReserveUpdate, ReserveResponse,
+)
+from .pricing import PricingService
 from .service import ReserveService
 
 reserve_router = APIRouter(prefix="/reserves", tags=["reserves"])
+reserve_page_serializer = JSONSerializer(Page[ReserveResponse])
 
 @reserve_router.post("/", response_model=ReserveResponse)
-async def create_reserve(reserve_data: ReserveCreate, db: DbSession):
+async def create_reserve(request: Request, reserve_data: ReserveCreate, db: DbSession, user: CurrentUser):
+    # reserving charges the customer's wallet, so only they or an admin may do it
+    CustomerOrAdminPermission(request=request, user=user, customer_id=reserve_data.customer_id)()
     return await ReserveService.create_reserve(db, reserve_data)
 
+@reserve_router.post("/batch", response_model=ReserveBatchResult)
+async def create_reserves(request: Request, batch: ReserveBatch, db: DbSession, user: CurrentUser):
+    CustomerOrAdminPermission(request=request, user=user, customer_id=batch.customer_id)()
+    return await ReserveService.create_reserves(db, batch)
+
+@reserve_router.post("/quote", response_model=Quote)
+async def quote_reserves(request: Request, quote_request: QuoteRequest, db: ReadDbSession, user: CurrentUser):
+    # a quote reveals the customer's subscription tier
+    CustomerOrAdminPermission(request=request, user=user, customer_id=quote_request.customer_id)()
+    return await PricingService.quote(db, quote_request.customer_id, quote_request.items)
+
+@reserve_router.get("/availability", response_model=List[BookAvailability])
+async def get_availability(
+    db: ReadDbSession,
+    start: datetime,
+    end: datetime,
+    book_id: List[int] = Query(..., max_length=settings.AVAILABILITY_MAX_BOOKS),
+):
+    start, end = (moment.replace(tzinfo=None) if moment.tzinfo else moment for moment in (start, end))
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    return await ReserveService.get_availability(db, book_id, start, end)
+
+@reserve_router.get(
+    "/customer/{user_id}", response_model=Page[ReserveResponse], dependencies=[Depends(current_user_or_admin)]
+)
+async def get_customer_reserves(
+    user_id: int,
+    db: ReadDbSession,
+    filters: ReserveFilter = Depends(),
+    limit: int = Query(settings.PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+):
+    reserves, next_cursor = await ReserveService.get_customer_reserves_page(db, user_id, filters, limit, cursor)
+    return reserve_page_serializer.response({"items": reserves, "next_cursor": next_cursor})
+
 @reserve_router.get("/{reserve_id}", response_model=ReserveResponse)
-async def get_reserve(reserve_id: int, db: DbSession):
+async def get_reserve(reserve_id: int, db: ReadDbSession):
     return await ReserveService.get_reserve(db, reserve_id)
 
 @reserve_router.put("/{reserve_id}", response_model=ReserveResponse)
-async def update_reserve(reserve_id: int, reserve_data: ReserveUpdate, db: DbSession):
+async def update_reserve(
+    request: Request, reserve_id: int, reserve_data: ReserveUpdate, db: DbSession, user: CurrentUser
+):
+    # repricing refunds the current owner and charges the new one, both must be the caller
+    for customer_id in (await ReserveService.get_owner(db, reserve_id), reserve_data.customer_id):
+        CustomerOrAdminPermission(request=request, user=user, customer_id=customer_id)()
     return await ReserveService.update_reserve(db, reserve_id, reserve_data)
 
+@reserve_router.post("/{reserve_id}/return", response_model=ReserveResponse)
+async def return_reserve(reserve_id: int, db: DbSession):
+    return await ReserveService.return_reserve(db, reserve_id)
+
 @reserve_router.delete("/{reserve_id}")
-async def delete_reserve(reserve_id: int, db: DbSession):
+async def delete_reserve(request: Request, reserve_id: int, db: DbSession, user: CurrentUser):
+    customer_id = await ReserveService.get_owner(db, reserve_id)
+    CustomerOrAdminPermission(request=request, user=user, customer_id=customer_id)()
     await ReserveService.delete_reserve(db, reserve_id)
     return {"message": "Reserve deleted successfully"}
@@ -0,0 +1,38 @@
+import os
+import sys
+from pathlib import Path
+
+import uvicorn
+from uvicorn.workers import UvicornWorker
+
+from src.config import settings
+
+
+GUNICORN_CONFIG = Path(__file__).resolve().parent.parent / "gunicorn.conf.py"
+
+
+class ProductionWorker(UvicornWorker):
+    """Uvicorn worker for gunicorn, pinned to uvloop and httptools so a missing extra fails loudly."""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on", "access_log": False}
+
+
+def main() -> None:
+    """Starts the server the way APP_ENV asks for.
+
+    production runs gunicorn with a ProductionWorker per core, see gunicorn.conf.py;
+    anything else runs a single reloading uvicorn process for development.
+    """
+    if settings.APP_ENV == "production":
+        os.execv(sys.executable, [sys.executable, "-m", "gunicorn", "--config", str(GUNICORN_CONFIG), "src.main:app"])
+    uvicorn.run(
+        "src.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        reload=True,
+        workers=1,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
 #! /bin/bash
 alembic upgrade head
-uvicorn src.main:app --reload --workers 1 --host 0.0.0.0 --port 8000
+# APP_ENV=production runs gunicorn with a worker per core, anything else the reloading dev server
+exec python -m src.server
@@ -0,0 +1,88 @@
+"""Fixtures for tests that run against the database at DATABASE_URL.
+
+The database must be migrated (``alembic upgrade head``); every test makes its
+own rows with unique names, so the suite can run against a database in use.
+"""
+from uuid import uuid4
+
+import httpx
+import pytest_asyncio
+
+from src.main import app
+from src.auth.models import User
+from src.book.models import Book, Gener
+from src.database.core import AsyncSessionLocal, engine
+from src.database.profiling import enable_query_profiling
+from src.profile.models import Author, Customer
+from src.profile.wallet import WalletService
+
+
+def unique(prefix: str = "") -> str:
+    return f"{prefix}{uuid4().hex[:12]}"
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def profiled_engine():
+    enable_query_profiling(engine)
+    yield engine
+    # pooled asyncpg connections belong to this test's event loop
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db():
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+@pytest_asyncio.fixture
+async def client():
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+
+
+@pytest_asyncio.fixture
+async def gener_id(db) -> int:
+    gener = Gener(name=unique("gener-"))
+    db.add(gener)
+    await db.commit()
+    return gener.id
+
+
+async def make_author(db) -> int:
+    user = User(username=unique("author-"), password=b"")
+    db.add(user)
+    await db.flush()
+    db.add(Author(user_id=user.id))
+    await db.commit()
+    return user.id
+
+
+@pytest_asyncio.fixture
+async def author_id(db) -> int:
+    return await make_author(db)
+
+
+async def make_customer(db, wallet: int = 0) -> int:
+    user = User(username=unique("customer-"), password=b"")
+    db.add(user)
+    await db.flush()
+    db.add(Customer(user=user.id))
+    await db.flush()
+    if wallet:
+        await WalletService.credit(db, user.id, wallet)
+    await db.commit()
+    return user.id
+
+
+@pytest_asyncio.fixture
+async def customer_id(db) -> int:
+    return await make_customer(db)
+
+
+async def insert_book(db, gener_id: int, unit: int = 1, price: int = 70) -> int:
+    book = Book(title="Stock", isbn=unique()[:13], price=price, gener=gener_id, unit=unit)
+    db.add(book)
+    await db.commit()
+    return book.id
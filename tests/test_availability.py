@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from src.reserve.service import free_windows
+
+
+START = datetime(2026, 1, 1)
+END = START + timedelta(days=10)
+
+
+def day(n: int) -> datetime:
+    return START + timedelta(days=n)
+
+
+def hold(start: int, end: int, returned_at: int = None) -> SimpleNamespace:
+    return SimpleNamespace(start=day(start), end=day(end), returned_at=None if returned_at is None else day(returned_at))
+
+
+def windows(copies: int, *reserves) -> list:
+    return [
+        ((window.start - START).days, (window.end - START).days, window.available)
+        for window in free_windows(copies, reserves, START, END)
+    ]
+
+
+def test_overlapping_holds():
+    assert windows(2, hold(1, 5), hold(3, 7)) == [(0, 1, 2), (1, 3, 1), (5, 7, 1), (7, 10, 2)]
+
+
+def test_early_return_frees_the_copy():
+    assert windows(1, hold(2, 8, returned_at=4)) == [(0, 2, 1), (4, 10, 1)]
+
+
+def test_hold_ending_at_the_window_end():
+    assert windows(1, hold(6, 10)) == [(0, 6, 1)]
+
+
+def test_holds_outside_the_window_are_ignored():
+    assert windows(1, hold(-5, 0), hold(10, 12)) == [(0, 10, 1)]
+
+
+def test_adjacent_windows_with_the_same_availability_merge():
+    assert windows(2, hold(2, 4), hold(4, 6)) == [(0, 2, 2), (2, 6, 1), (6, 10, 2)]
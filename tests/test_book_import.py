@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import func, select
+
+from src.book.importer import BookImportService
+from src.book.models import Book, BookAuthor, BookCreateSchema, BookImportReport
+from tests.conftest import unique
+
+
+async def records(*rows):
+    for row, data in enumerate(rows, start=1):
+        yield row, data, None
+
+
+def book_row(gener_id: int, author_ids, isbn=None) -> dict:
+    return {
+        "title": "Imported", "isbn": isbn or unique()[:13], "price": 10, "gener": gener_id, "unit": 1,
+        "author_ids": author_ids, "blurbs": ["b"] * len(author_ids),
+    }
+
+
+@pytest.mark.asyncio
+async def test_import_reports_duplicate_author_ids_per_row(db, gener_id, author_id):
+    good = book_row(gener_id, [author_id])
+    duplicate = book_row(gener_id, [author_id, author_id])
+
+    report = await BookImportService.import_books(db, records(good, duplicate), batch_size=10)
+
+    assert (report.total, report.created, report.failed) == (2, 1, 1)
+    assert report.errors[0].row == 2
+    assert report.errors[0].errors == ["author_ids: Duplicate author id"]
+    links = await db.scalar(
+        select(func.count()).select_from(BookAuthor).join(Book).where(Book.isbn == good["isbn"])
+    )
+    assert links == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_rejected_by_the_database_is_reported(db, gener_id, author_id):
+    # skips the row validation of import_books, so the duplicate link reaches the book_author primary key
+    batch = [(1, BookCreateSchema.model_validate(book_row(gener_id, [author_id, author_id])))]
+    report = BookImportReport()
+
+    await BookImportService._load_batch(db, batch, report)
+
+    assert report.created == 0
+    assert [error.row for error in report.errors] == [1]
+    assert report.errors[0].errors[0].startswith("Batch rejected by the database")
+    assert not await db.scalar(select(func.count()).select_from(Book).where(Book.isbn == batch[0][1].isbn))
@@ -0,0 +1,65 @@
+"""Query budgets of the book write paths and routes."""
+import pytest
+
+from src.book.models import BookCreateSchema, UpdateBookSchema
+from src.book.service import BookService
+from src.database.profiling import profile_queries
+from tests.conftest import make_author, unique
+
+
+async def make_book(db, gener_id: int, author_id: int):
+    book_data = BookCreateSchema(
+        title="Dune", isbn=unique()[:13], price=100, gener=gener_id, unit=1, author_ids=[author_id], blurbs=["b"],
+    )
+    return await BookService.create_book(db, book_data, book_data.author_ids, book_data.blurbs)
+
+
+@pytest.mark.asyncio
+async def test_create_book_query_budget(db, gener_id, author_id):
+    # isbn/gener check, authors, book insert, book_author insert
+    with profile_queries("create_book") as profile:
+        book = await make_book(db, gener_id, author_id)
+    assert book.id is not None
+    profile.assert_budget(4)
+
+
+@pytest.mark.asyncio
+async def test_update_book_query_budget(db, gener_id, author_id):
+    book = await make_book(db, gener_id, author_id)
+    other_author_id = await make_author(db)
+    # book with its authors, new authors, book update, link insert and delete
+    update = UpdateBookSchema(price=120, author_ids=[other_author_id], blurbs=["updated"])
+    with profile_queries("update_book") as profile:
+        await BookService.update_book(db, book.id, update)
+    profile.assert_budget(5)
+
+
+@pytest.mark.asyncio
+async def test_delete_book_query_budget(db, gener_id, author_id):
+    book = await make_book(db, gener_id, author_id)
+    with profile_queries("delete_book") as profile:
+        await BookService.delete_book(db, book.id)
+    profile.assert_budget(2)
+    assert not await BookService.exists(db, book.id)
+
+
+@pytest.mark.asyncio
+async def test_get_book_route_query_budget(client, db, gener_id, author_id):
+    book = await make_book(db, gener_id, author_id)
+    # the book row, then its authors
+    with profile_queries("GET /book/{id}") as profile:
+        response = await client.get(f"/book/{book.id}")
+    assert response.status_code == 200
+    profile.assert_budget(2)
+    with pytest.raises(AssertionError, match="issued 2 queries, budget is 1"):
+        profile.assert_budget(1)
+
+
+@pytest.mark.asyncio
+async def test_cached_get_book_runs_no_queries(client, db, gener_id, author_id):
+    book = await make_book(db, gener_id, author_id)
+    etag = (await client.get(f"/book/{book.id}")).headers["ETag"]
+    with profile_queries("GET /book/{id}") as profile:
+        assert (await client.get(f"/book/{book.id}")).status_code == 200
+        assert (await client.get(f"/book/{book.id}", headers={"If-None-Match": etag})).status_code == 304
+    profile.assert_budget(0)
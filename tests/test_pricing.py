@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from src.reserve.pricing import reservation_days
+
+
+START = datetime(2026, 1, 1)
+
+
+@pytest.mark.parametrize("length, days", [
+    (timedelta(microseconds=1), 1),
+    (timedelta(seconds=1), 1),
+    (timedelta(days=1), 1),
+    (timedelta(days=1, microseconds=1), 2),
+    (timedelta(days=4), 4),
+])
+def test_reservation_days_counts_started_days(length, days):
+    assert reservation_days(START, START + length) == days
+
+
+def test_reservation_days_rejects_empty_window():
+    with pytest.raises(HTTPException):
+        reservation_days(START, START)
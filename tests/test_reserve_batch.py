@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from src.book.models import Book
+from src.profile.models import Customer
+from src.reserve.models import Reserve, ReserveBatch
+from src.reserve.service import ReserveService
+from tests.conftest import insert_book, make_customer
+
+
+START = datetime(2026, 1, 1)
+WEEK = timedelta(days=7)
+
+
+def cart(customer_id: int, *book_ids: int) -> ReserveBatch:
+    return ReserveBatch(
+        customer_id=customer_id,
+        items=[{"book_id": book_id, "start": START, "end": START + WEEK} for book_id in book_ids],
+    )
+
+
+async def state(db, customer_id: int, book_ids):
+    """Stock of the books, the customer's reservations and balance, read fresh from the database."""
+    units = dict((await db.execute(select(Book.id, Book.unit).where(Book.id.in_(book_ids)))).all())
+    reserves = await db.scalar(select(func.count()).select_from(Reserve).where(Reserve.customer_id == customer_id))
+    wallet = await db.scalar(select(Customer.wallet_money).where(Customer.user == customer_id))
+    return units, reserves, wallet
+
+
+async def assert_rejected(db, batch: ReserveBatch, book_ids, status_code: int):
+    before = await state(db, batch.customer_id, book_ids)
+    with pytest.raises(HTTPException) as exc:
+        await ReserveService.create_reserves(db, batch)
+    assert exc.value.status_code == status_code
+    assert await state(db, batch.customer_id, book_ids) == before
+
+
+@pytest.mark.asyncio
+async def test_out_of_stock_item_rejects_the_cart(db, gener_id):
+    customer_id = await make_customer(db, wallet=1000)
+    in_stock, sold_out = await insert_book(db, gener_id, unit=1), await insert_book(db, gener_id, unit=0)
+    await assert_rejected(db, cart(customer_id, in_stock, sold_out), [in_stock, sold_out], 409)
+
+
+@pytest.mark.asyncio
+async def test_unknown_book_rejects_the_cart(db, gener_id):
+    customer_id = await make_customer(db, wallet=1000)
+    book_id = await insert_book(db, gener_id, unit=1)
+    await assert_rejected(db, cart(customer_id, book_id, book_id + 10**6), [book_id], 409)
+
+
+@pytest.mark.asyncio
+async def test_insufficient_balance_rejects_the_cart(db, gener_id):
+    customer_id = await make_customer(db, wallet=100)
+    first, second = await insert_book(db, gener_id, price=70), await insert_book(db, gener_id, price=70)
+    await assert_rejected(db, cart(customer_id, first, second), [first, second], 400)
+
+
+@pytest.mark.asyncio
+async def test_repeated_book_takes_one_unit_per_item(db, gener_id):
+    customer_id = await make_customer(db, wallet=1000)
+    book_id = await insert_book(db, gener_id, unit=3, price=70)
+
+    result = await ReserveService.create_reserves(db, cart(customer_id, book_id, book_id))
+
+    assert result.total == 140
+    assert await state(db, customer_id, [book_id]) == ({book_id: 1}, 2, 860)
+    await assert_rejected(db, cart(customer_id, book_id, book_id), [book_id], 409)
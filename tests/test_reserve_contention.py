@@ -0,0 +1,42 @@
+"""Concurrent reservations of one book must never oversell it nor lose a stock update."""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from src.book.models import Book
+from src.database.core import AsyncSessionLocal
+from src.reserve.models import Reserve, ReserveCreate
+from src.reserve.service import ReserveService
+from tests.conftest import insert_book, make_customer
+
+
+UNITS = 5
+RESERVERS = 40
+
+
+async def reserve_once(customer_id: int, book_id: int) -> int:
+    start = datetime(2026, 1, 1)
+    data = ReserveCreate(customer_id=customer_id, book_id=book_id, start=start, end=start + timedelta(days=7))
+    # every reserver has its own session, so its own connection and transaction
+    async with AsyncSessionLocal() as session:
+        try:
+            await ReserveService.create_reserve(session, data)
+            return 200
+        except HTTPException as exc:
+            return exc.status_code
+
+
+@pytest.mark.asyncio
+async def test_concurrent_reservations_take_exactly_the_stock(db, gener_id):
+    book_id = await insert_book(db, gener_id, unit=UNITS, price=10)
+    customer_id = await make_customer(db, wallet=10 * RESERVERS)
+
+    codes = await asyncio.gather(*(reserve_once(customer_id, book_id) for _ in range(RESERVERS)))
+
+    assert codes.count(200) == UNITS
+    assert codes.count(409) == RESERVERS - UNITS
+    assert await db.scalar(select(func.count()).select_from(Reserve).where(Reserve.book_id == book_id)) == UNITS
+    assert await db.scalar(select(Book.unit).where(Book.id == book_id)) == 0
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+from tests.conftest import insert_book, make_customer, unique
+
+
+async def login_customer(client) -> tuple:
+    """Registers a customer through the API, returning its id and auth headers."""
+    username = unique("quote-")
+    response = await client.post("/profile/customer", json={"user": {
+        "username": username, "password": "pw", "email": f"{username}@example.com", "last_name": "x",
+        "phone_number": f"09{uuid4().int % 10**9:09d}",
+    }})
+    token = (await client.post("/auth/login", json={"username": username, "password": "pw"})).json()["token"]
+    return response.json()["user_id"], {"Authorization": f"Bearer {token}"}
+
+
+def quote_body(customer_id: int, book_id: int) -> dict:
+    start = datetime(2026, 1, 1)
+    return {"customer_id": customer_id, "items": [
+        {"book_id": book_id, "start": start.isoformat(), "end": (start + timedelta(days=7)).isoformat()},
+    ]}
+
+
+@pytest.mark.asyncio
+async def test_quote_is_limited_to_the_customer(client, db, gener_id):
+    book_id = await insert_book(db, gener_id, price=70)
+    customer_id, headers = await login_customer(client)
+    other_id = await make_customer(db)
+
+    assert (await client.post("/reserves/quote", json=quote_body(customer_id, book_id))).status_code == 401
+    assert (await client.post("/reserves/quote", json=quote_body(other_id, book_id), headers=headers)).status_code == 403
+    response = await client.post("/reserves/quote", json=quote_body(customer_id, book_id), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["total"] == 70
@@ -0,0 +1,31 @@
+import time
+
+from src.auth.cache import TokenCache
+from src.auth.models import UserRead
+from src.enums import UserRoles
+
+
+def user(user_id: int) -> UserRead:
+    return UserRead(id=user_id, username=f"user{user_id}", role=UserRoles.CUSTOMER)
+
+
+def test_invalidate_user_drops_every_token_of_the_user():
+    cache = TokenCache(maxsize=10, ttl=60)
+    exp = time.time() + 3600
+    cache.set("a", user(1), exp)
+    cache.set("b", user(1), exp)
+    cache.set("c", user(2), exp)
+
+    cache.invalidate_user(1)
+
+    assert cache.get("a") is None and cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_users_are_forgotten_with_their_tokens():
+    cache = TokenCache(maxsize=2, ttl=60)
+    exp = time.time() + 3600
+    for user_id in range(1, 101):
+        cache.set(f"token{user_id}", user(user_id), exp)
+
+    assert len(cache._tokens_by_user) == 2
@@ -0,0 +1,108 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+
+from src.database.core import AsyncSessionLocal
+from src.enums import WalletTransactionKind
+from src.profile.models import Customer, WalletSnapshot, WalletTransaction
+from src.profile.wallet import WalletService
+from src.reserve.models import ReserveCreate, ReserveUpdate
+from src.reserve.service import ReserveService
+from tests.conftest import insert_book, make_customer
+
+
+async def ledger_sum(db, customer_id: int, **filters) -> int:
+    return await db.scalar(
+        select(func.coalesce(func.sum(WalletTransaction.amount), 0))
+        .where(WalletTransaction.customer_id == customer_id)
+        .filter_by(**filters)
+    )
+
+
+async def wallet_money(db, customer_id: int) -> int:
+    return await db.scalar(select(Customer.wallet_money).where(Customer.user == customer_id))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_debits_never_overdraw(db):
+    customer_id = await make_customer(db, wallet=100)
+
+    async def debit():
+        async with AsyncSessionLocal() as session:
+            try:
+                await WalletService.debit(session, customer_id, 10)
+                await session.commit()
+                return True
+            except HTTPException as exc:
+                assert exc.status_code == 400
+                return False
+
+    results = await asyncio.gather(*(debit() for _ in range(15)))
+
+    assert results.count(True) == 10
+    assert await wallet_money(db, customer_id) == 0
+    assert await ledger_sum(db, customer_id) == 0
+
+
+@pytest.mark.asyncio
+async def test_set_balance_records_the_difference(db):
+    customer_id = await make_customer(db, wallet=30)
+
+    row = await WalletService.set_balance(db, customer_id, 100, note="correction")
+    await db.commit()
+
+    assert (row.amount, row.kind, row.note) == (70, WalletTransactionKind.ADJUSTMENT, "correction")
+    assert await WalletService.set_balance(db, customer_id, 100) is None
+    assert await wallet_money(db, customer_id) == await ledger_sum(db, customer_id) == 100
+
+
+@pytest.mark.asyncio
+async def test_balance_at_a_moment_agrees_with_and_without_a_snapshot(db):
+    customer_id = await make_customer(db, wallet=10)
+    await WalletService.credit(db, customer_id, 20)
+    await db.commit()
+    await WalletService.snapshot_balances(db)
+    await WalletService.debit(db, customer_id, 5)
+    await db.commit()
+    at = datetime.utcnow()
+    await WalletService.credit(db, customer_id, 7)
+    await db.commit()
+
+    with_snapshot = await WalletService.get_balance(db, customer_id, at=at)
+    await db.execute(delete(WalletSnapshot).where(WalletSnapshot.customer_id == customer_id))
+    await db.commit()
+    without_snapshot = await WalletService.get_balance(db, customer_id, at=at)
+
+    assert with_snapshot == without_snapshot == 25
+    assert await WalletService.get_balance(db, customer_id) == 32
+
+
+@pytest.mark.asyncio
+async def test_reservation_changes_balance_out(db, gener_id):
+    customer_id = await make_customer(db, wallet=1000)
+    book_id = await insert_book(db, gener_id, unit=1, price=70)
+    start = datetime(2026, 1, 1)
+
+    reserve = await ReserveService.create_reserve(db, ReserveCreate(
+        customer_id=customer_id, book_id=book_id, start=start, end=start + timedelta(days=7),
+    ))
+    assert await wallet_money(db, customer_id) == 930
+
+    await ReserveService.update_reserve(db, reserve.id, ReserveUpdate(
+        customer_id=customer_id, book_id=book_id, start=start, end=start + timedelta(days=14),
+    ))
+    assert await wallet_money(db, customer_id) == 860
+    assert await ledger_sum(db, customer_id, reserve_id=reserve.id) == -140
+
+    await ReserveService.delete_reserve(db, reserve.id)
+    assert await wallet_money(db, customer_id) == await ledger_sum(db, customer_id) == 1000
+    kinds = (await db.scalars(
+        select(WalletTransaction.kind).where(WalletTransaction.customer_id == customer_id).order_by(WalletTransaction.id)
+    )).all()
+    assert kinds == [
+        WalletTransactionKind.CREDIT, WalletTransactionKind.RESERVATION, WalletTransactionKind.REFUND,
+        WalletTransactionKind.RESERVATION, WalletTransactionKind.REFUND,
+    ]